@@ -1,8 +1,10 @@
 class Calc:
-    def sign_extend(data: int, num_bit_width: int):
+    @staticmethod
+    def sign_extend(data: int, num_bit_width: int) -> int:
         """
         Sign extend the data to the given bit width
+
+        分岐なしで (data ^ sign_bit) - sign_bit により符号拡張する
         """
-        if data & (1 << (num_bit_width - 1)):
-            data -= 1 << num_bit_width
-        return data
+        sign_bit = 1 << (num_bit_width - 1)
+        return ((data & ((1 << num_bit_width) - 1)) ^ sign_bit) - sign_bit
@@ -1,18 +1,35 @@
 import enum
 import logging
-from ctypes import LittleEndianStructure, Union, c_uint32
 from dataclasses import dataclass, field
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Final,
+    FrozenSet,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from emu.mem import AccessType, BusError, BusSlave, SysAddr
 
-from bonsai.emu.calc import Calc
+# RV32のみ実装しているので、register幅のmask/符号bitは定数で持つ
+# (即値のsign extendも同様に、bit幅ごとの符号bitを埋め込んで (data ^ sign_bit) - sign_bit で行う)
+MASK32: Final = 0xFFFFFFFF
+SIGN_BIT32: Final = 0x80000000
+# 命令長。PC更新のたびにSysAddrのclass attributeを引かないようにmodule定数にしておく
+NUM_WORD_BYTES: Final = SysAddr.NUM_WORD_BYTES
 
 
 @enum.unique
-class ExceptionCode(enum.Enum):
+class ExceptionCode(enum.IntEnum):
     """
     CPU例外の種類
+    値はmcauseのException Codeと一致させているので、intとしてそのまま扱える
+    (0も有効な例外コードなので、例外なしはNoneで表す)
     """
 
     INST_ADDR_MISALIGN = 0
@@ -46,19 +63,76 @@ class InterruptCode(enum.Enum):
     TIMER = enum.auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class ProgramCounter:
     """参照渡しするためだけにコンテナにした"""
 
     value: SysAddr.AddrU32
 
 
+@dataclass(slots=True)
+class InstBuffer:
+    """
+    命令フェッチ用のbuffer
+    RAM/ROMの生データを直接参照できる場合はその領域全体を、
+    できない場合はslave.read_blockでまとめて読み出した範囲を保持し、1命令ごとのbus accessを省略する
+    """
+
+    # 1回のrefillで読み出すword数 (2の累乗)
+    NUM_WORDS: ClassVar[int] = 64
+
+    # 先頭アドレス
+    base_addr: SysAddr.AddrU32 = 0
+    # 読み出し済の命令データ
+    datas: List[SysAddr.DataU32] = field(default_factory=list)
+    # datasがslaveの生データそのものであればTrue (書き込みが反映されるので破棄不要)
+    is_view: bool = False
+
+    def clear(self) -> None:
+        """
+        Clear the buffer
+        """
+        self.datas = []
+        self.is_view = False
+
+    def refill(self, addr: SysAddr.AddrU32, slave: BusSlave) -> bool:
+        """
+        addrを含む範囲を読み直す。読めなかった場合はFalse
+        """
+        # 生データを参照できればコピーせずに領域ごと使う
+        view = slave.get_word_view(addr)
+        if view is not None and view[0] % NUM_WORD_BYTES == 0:
+            self.base_addr, self.datas = view
+            self.is_view = True
+            return True
+        # できなければblock単位でコピー
+        base_addr = addr & ~(self.NUM_WORDS * NUM_WORD_BYTES - 1)
+        datas, access_ret = slave.read_block(base_addr, self.NUM_WORDS)
+        if access_ret is not None:
+            self.clear()
+            return False
+        self.base_addr = base_addr
+        self.datas = datas
+        self.is_view = False
+        return True
+
+    def invalidate(self, addr: SysAddr.AddrU32) -> None:
+        """
+        指定アドレスがbuffer内であれば破棄する (自己書き換えコード向け)
+        """
+        if self.is_view:
+            return
+        offset = addr - self.base_addr
+        if 0 <= offset < len(self.datas) * NUM_WORD_BYTES:
+            self.clear()
+
+
 class IfStage:
     """
     命令フェッチを実行する
     """
 
-    @dataclass
+    @dataclass(slots=True)
     class Result:
         # PC
         pc: SysAddr.AddrU32
@@ -70,13 +144,25 @@ class IfStage:
 
     @staticmethod
     def run(
-        pc: ProgramCounter, slave: BusSlave
+        pc: ProgramCounter, slave: BusSlave, inst_buf: InstBuffer | None = None
     ) -> Tuple[Optional["IfStage.Result"], ExceptionCode | None]:
+        # bufferにあればbus accessせずに返す。なければまとめて読み直す
+        if inst_buf is not None and pc.value % NUM_WORD_BYTES == 0:
+            word_idx = (pc.value - inst_buf.base_addr) // NUM_WORD_BYTES
+            if not (0 <= word_idx < len(inst_buf.datas)) and inst_buf.refill(
+                pc.value, slave
+            ):
+                word_idx = (pc.value - inst_buf.base_addr) // NUM_WORD_BYTES
+            if 0 <= word_idx < len(inst_buf.datas):
+                return IfStage.Result(pc.value, inst_buf.datas[word_idx]), None
+        # bufferを使わない/読めなかった場合は1wordずつ読む (例外もここで判定)
         exception: ExceptionCode | None = None
         # 命令データ取得
         inst_data, access_ret = slave.read(pc.value, AccessType.NORMAL)
         if access_ret is not None:
-            logging.warning(f"Failed to read instruction: {pc=}, {access_ret=}")
+            logging.warning(
+                "Failed to read instruction: pc=%r, access_ret=%r", pc, access_ret
+            )
             exception = ExceptionCode.from_buserr(bus_err=access_ret)
         return IfStage.Result(pc.value, inst_data), exception
 
@@ -120,7 +206,7 @@ class InstGroup(enum.Enum):
 
 
 @enum.unique
-class InstType(enum.Enum):
+class InstType(enum.IntEnum):
     """
     Instruction Names
     """
@@ -194,35 +280,73 @@ class InstType(enum.Enum):
     AMOMIN_W = enum.auto()
 
 
-class InstCommon(LittleEndianStructure):
-    _pack_ = 1
-    _fields_ = [
-        ("opcode", c_uint32, 7),
-        ("reserved", c_uint32, 25),
-    ]
+# M拡張の命令。CoreConfig.enable_m=Falseの場合は不正命令として扱う
+M_EXTENSION_INST_TYPES: FrozenSet[InstType] = frozenset(
+    {
+        InstType.MUL,
+        InstType.MULH,
+        InstType.MULSU,
+        InstType.MULU,
+        InstType.DIV,
+        InstType.DIVU,
+        InstType.REM,
+        InstType.REMU,
+    }
+)
 
 
-class InstRType(LittleEndianStructure):
-    _pack_ = 1
-    _fields_ = [
-        ("opcode", c_uint32, 7),
-        ("rd", c_uint32, 5),
-        ("funct3", c_uint32, 3),
-        ("rs1", c_uint32, 5),
-        ("rs2", c_uint32, 5),
-        ("funct7", c_uint32, 7),
-    ]
+# 命令フォーマットごとのfield
+# ctypesのbitfieldはfieldアクセスごとにdescriptorを経由して遅く、PyPyのJITも効かないため、
+# rawからshift+maskで1度だけ取り出して保持する
 
 
-class InstIType(LittleEndianStructure):
-    _pack_ = 1
-    _fields_ = [
-        ("opcode", c_uint32, 7),
-        ("rd", c_uint32, 5),
-        ("funct3", c_uint32, 3),
-        ("rs1", c_uint32, 5),
-        ("imm_11_0", c_uint32, 12),
-    ]
+@dataclass(slots=True)
+class InstCommon:
+    opcode: int
+
+    @classmethod
+    def from_raw(cls, raw: SysAddr.DataU32) -> "InstCommon":
+        return cls(opcode=raw & 0x7F)
+
+
+@dataclass(slots=True)
+class InstRType:
+    opcode: int
+    rd: int
+    funct3: int
+    rs1: int
+    rs2: int
+    funct7: int
+
+    @classmethod
+    def from_raw(cls, raw: SysAddr.DataU32) -> "InstRType":
+        return cls(
+            opcode=raw & 0x7F,
+            rd=(raw >> 7) & 0x1F,
+            funct3=(raw >> 12) & 0x7,
+            rs1=(raw >> 15) & 0x1F,
+            rs2=(raw >> 20) & 0x1F,
+            funct7=(raw >> 25) & 0x7F,
+        )
+
+
+@dataclass(slots=True)
+class InstIType:
+    opcode: int
+    rd: int
+    funct3: int
+    rs1: int
+    imm_11_0: int
+
+    @classmethod
+    def from_raw(cls, raw: SysAddr.DataU32) -> "InstIType":
+        return cls(
+            opcode=raw & 0x7F,
+            rd=(raw >> 7) & 0x1F,
+            funct3=(raw >> 12) & 0x7,
+            rs1=(raw >> 15) & 0x1F,
+            imm_11_0=(raw >> 20) & 0xFFF,
+        )
 
     @property
     def imm(self) -> int:
@@ -230,19 +354,28 @@ class InstIType(LittleEndianStructure):
 
     @property
     def imm_sext(self) -> int:
-        return Calc.sign_extend(data=self.imm, num_bit_width=12)
-
-
-class InstSType(LittleEndianStructure):
-    _pack_ = 1
-    _fields_ = [
-        ("opcode", c_uint32, 7),
-        ("imm_4_0", c_uint32, 5),
-        ("funct3", c_uint32, 3),
-        ("rs1", c_uint32, 5),
-        ("rs2", c_uint32, 5),
-        ("imm_11_5", c_uint32, 7),
-    ]
+        return (self.imm_11_0 ^ 0x800) - 0x800
+
+
+@dataclass(slots=True)
+class InstSType:
+    opcode: int
+    imm_4_0: int
+    funct3: int
+    rs1: int
+    rs2: int
+    imm_11_5: int
+
+    @classmethod
+    def from_raw(cls, raw: SysAddr.DataU32) -> "InstSType":
+        return cls(
+            opcode=raw & 0x7F,
+            imm_4_0=(raw >> 7) & 0x1F,
+            funct3=(raw >> 12) & 0x7,
+            rs1=(raw >> 15) & 0x1F,
+            rs2=(raw >> 20) & 0x1F,
+            imm_11_5=(raw >> 25) & 0x7F,
+        )
 
     @property
     def imm(self) -> int:
@@ -250,43 +383,47 @@ class InstSType(LittleEndianStructure):
 
     @property
     def imm_sext(self) -> int:
-        return Calc.sign_extend(data=self.imm, num_bit_width=12)
-
-
-class InstBType(LittleEndianStructure):
-    _pack_ = 1
-    _fields_ = [
-        ("opcode", c_uint32, 7),
-        ("imm_11", c_uint32, 1),
-        ("imm_4_1", c_uint32, 4),
-        ("funct3", c_uint32, 3),
-        ("rs1", c_uint32, 5),
-        ("rs2", c_uint32, 5),
-        ("imm_10_5", c_uint32, 6),
-        ("imm_12", c_uint32, 1),
-    ]
+        return (self.imm ^ 0x800) - 0x800
 
-    @property
-    def imm(self) -> int:
-        return (
-            (self.imm_12 << 12)
-            | (self.imm_11 << 11)
-            | (self.imm_10_5 << 5)
-            | (self.imm_4_1 << 1)
+
+@dataclass(slots=True)
+class InstBType:
+    opcode: int
+    imm_11: int
+    imm_4_1: int
+    funct3: int
+    rs1: int
+    rs2: int
+    imm_10_5: int
+    imm_12: int
+
+    @classmethod
+    def from_raw(cls, raw: SysAddr.DataU32) -> "InstBType":
+        return cls(
+            opcode=raw & 0x7F,
+            imm_11=(raw >> 7) & 0x1,
+            imm_4_1=(raw >> 8) & 0xF,
+            funct3=(raw >> 12) & 0x7,
+            rs1=(raw >> 15) & 0x1F,
+            rs2=(raw >> 20) & 0x1F,
+            imm_10_5=(raw >> 25) & 0x3F,
+            imm_12=(raw >> 31) & 0x1,
         )
 
-    @property
-    def imm_sext(self) -> int:
-        return Calc.sign_extend(data=self.imm, num_bit_width=13)
 
+@dataclass(slots=True)
+class InstUType:
+    opcode: int
+    rd: int
+    imm_31_12: int
 
-class InstUType(LittleEndianStructure):
-    _pack_ = 1
-    _fields_ = [
-        ("opcode", c_uint32, 7),
-        ("rd", c_uint32, 5),
-        ("imm_31_12", c_uint32, 20),
-    ]
+    @classmethod
+    def from_raw(cls, raw: SysAddr.DataU32) -> "InstUType":
+        return cls(
+            opcode=raw & 0x7F,
+            rd=(raw >> 7) & 0x1F,
+            imm_31_12=(raw >> 12) & 0xFFFFF,
+        )
 
     @property
     def imm(self) -> int:
@@ -294,61 +431,269 @@ class InstUType(LittleEndianStructure):
 
     @property
     def imm_sext(self) -> int:
-        return Calc.sign_extend(data=self.imm, num_bit_width=20)
-
-
-class InstJType(LittleEndianStructure):
-    _pack_ = 1
-    _fields_ = [
-        ("opcode", c_uint32, 7),
-        ("rd", c_uint32, 5),
-        ("imm_19_12", c_uint32, 8),
-        ("imm_11", c_uint32, 1),
-        ("imm_10_1", c_uint32, 10),
-        ("imm_20", c_uint32, 1),
-    ]
+        return (self.imm ^ SIGN_BIT32) - SIGN_BIT32
+
+
+@dataclass(slots=True)
+class InstJType:
+    opcode: int
+    rd: int
+    imm_19_12: int
+    imm_11: int
+    imm_10_1: int
+    imm_20: int
+
+    @classmethod
+    def from_raw(cls, raw: SysAddr.DataU32) -> "InstJType":
+        return cls(
+            opcode=raw & 0x7F,
+            rd=(raw >> 7) & 0x1F,
+            imm_19_12=(raw >> 12) & 0xFF,
+            imm_11=(raw >> 20) & 0x1,
+            imm_10_1=(raw >> 21) & 0x3FF,
+            imm_20=(raw >> 31) & 0x1,
+        )
+
+
+@dataclass(slots=True)
+class InstAtomicType:
+    opcode: int
+    rd: int
+    funct3: int
+    rs1: int
+    rs2: int
+    rl: int
+    aq: int
+    funct5: int
+
+    @classmethod
+    def from_raw(cls, raw: SysAddr.DataU32) -> "InstAtomicType":
+        return cls(
+            opcode=raw & 0x7F,
+            rd=(raw >> 7) & 0x1F,
+            funct3=(raw >> 12) & 0x7,
+            rs1=(raw >> 15) & 0x1F,
+            rs2=(raw >> 20) & 0x1F,
+            rl=(raw >> 25) & 0x1,
+            aq=(raw >> 26) & 0x1,
+            funct5=(raw >> 27) & 0x1F,
+        )
+
+
+class Operand:
+    """
+    命令データ
+    各命令フォーマットとして解釈したfieldをまとめて保持する
+    """
+
+    __slots__ = ("raw", "common", "r", "i", "s", "b", "u", "j", "atomic")
+
+    def __init__(self, raw: SysAddr.DataU32 = 0) -> None:
+        self.raw = raw
+        self.common = InstCommon.from_raw(raw)
+        self.r = InstRType.from_raw(raw)
+        self.i = InstIType.from_raw(raw)
+        self.s = InstSType.from_raw(raw)
+        self.b = InstBType.from_raw(raw)
+        self.u = InstUType.from_raw(raw)
+        self.j = InstJType.from_raw(raw)
+        self.atomic = InstAtomicType.from_raw(raw)
+
+    # B/J-Typeの即値はfieldを個別に読んで組み立てるとfield数分のアクセスが発生するため、
+    # rawから移動先ごとにまとめたshift+maskで1回で並べ替える
 
     @property
-    def imm(self) -> int:
+    def b_imm(self) -> int:
+        """
+        B-Type immediate: imm[12|10:5] = raw[31:25], imm[4:1|11] = raw[11:7]
+        """
+        raw = self.raw
         return (
-            (self.imm_20 << 20)
-            | (self.imm_19_12 << 12)
-            | (self.imm_11 << 11)
-            | (self.imm_10_1 << 1)
+            ((raw >> 19) & 0x1000)
+            | ((raw << 4) & 0x800)
+            | ((raw >> 20) & 0x7E0)
+            | ((raw >> 7) & 0x1E)
         )
 
     @property
-    def imm_sext(self) -> int:
-        return Calc.sign_extend(data=self.imm, num_bit_width=21)
-
-
-class InstAtomicType(LittleEndianStructure):
-    _pack_ = 1
-    _fields_ = [
-        ("opcode", c_uint32, 7),
-        ("rd", c_uint32, 5),
-        ("funct3", c_uint32, 3),
-        ("rs1", c_uint32, 5),
-        ("rs2", c_uint32, 5),
-        ("rl", c_uint32, 1),
-        ("aq", c_uint32, 1),
-        ("funct5", c_uint32, 5),
-    ]
+    def b_imm_sext(self) -> int:
+        return (self.b_imm ^ 0x1000) - 0x1000
 
+    @property
+    def j_imm(self) -> int:
+        """
+        J-Type immediate: imm[20|10:1|11|19:12] = raw[31:12]
+        """
+        raw = self.raw
+        return (
+            ((raw >> 11) & 0x100000)
+            | (raw & 0xFF000)
+            | ((raw >> 9) & 0x800)
+            | ((raw >> 20) & 0x7FE)
+        )
 
-class Operand(Union):
-    _pack_ = 1
-    _fields_ = [
-        ("raw", c_uint32),
-        ("common", InstCommon),
-        ("r", InstRType),
-        ("i", InstIType),
-        ("s", InstSType),
-        ("b", InstBType),
-        ("u", InstUType),
-        ("j", InstJType),
-        ("atomic", InstAtomicType),
-    ]
+    @property
+    def j_imm_sext(self) -> int:
+        return (self.j_imm ^ 0x100000) - 0x100000
+
+
+# 命令デコード用のテーブル
+# IdStage.run で命令ごとに作り直さないようにmodule levelで1度だけ作る
+# field値をそのままindexにできるよう、dictで定義したものを未定義=Noneのtupleに展開して使う
+
+# R-Type: (funct7 << 3) | funct3 -> type
+_R_INST_TYPES: Dict[int, InstType] = {
+    # Base Integer
+    (0b0000000 << 3) | 0b000: InstType.ADD,
+    (0b0100000 << 3) | 0b000: InstType.SUB,
+    (0b0000000 << 3) | 0b001: InstType.SLL,
+    (0b0000000 << 3) | 0b010: InstType.SLT,
+    (0b0000000 << 3) | 0b011: InstType.SLTU,
+    (0b0000000 << 3) | 0b100: InstType.XOR,
+    (0b0000000 << 3) | 0b101: InstType.SRL,
+    (0b0100000 << 3) | 0b101: InstType.SRA,
+    (0b0000000 << 3) | 0b110: InstType.OR,
+    (0b0000000 << 3) | 0b111: InstType.AND,
+    # Multiply Extension
+    (0b0000001 << 3) | 0b000: InstType.MUL,
+    (0b0000001 << 3) | 0b001: InstType.MULH,
+    (0b0000001 << 3) | 0b010: InstType.MULSU,
+    (0b0000001 << 3) | 0b011: InstType.MULU,
+    (0b0000001 << 3) | 0b100: InstType.DIV,
+    (0b0000001 << 3) | 0b101: InstType.DIVU,
+    (0b0000001 << 3) | 0b110: InstType.REM,
+    (0b0000001 << 3) | 0b111: InstType.REMU,
+}
+R_INST_TYPES: Tuple[Optional[InstType], ...] = tuple(
+    _R_INST_TYPES.get(key) for key in range(1 << 10)
+)
+
+# I-Type Arithmetic: funct3 -> type
+_I_ARITHMETIC_INST_TYPES: Dict[int, InstType] = {
+    0b000: InstType.ADDI,
+    # 0b001, 0b101はshift (I_SHIFT_INST_TYPES)
+    0b010: InstType.SLTI,
+    0b011: InstType.SLTIU,
+    0b100: InstType.XORI,
+    0b110: InstType.ORI,
+    0b111: InstType.ANDI,
+}
+I_ARITHMETIC_INST_TYPES: Tuple[Optional[InstType], ...] = tuple(
+    _I_ARITHMETIC_INST_TYPES.get(key) for key in range(8)
+)
+
+# I-Type shift: (imm[11:5] << 3) | funct3 -> type
+# imm[11:5]はR-Typeのfunct7と同じ位置で、論理/算術の区別以外は0でなければならない
+_I_SHIFT_INST_TYPES: Dict[int, InstType] = {
+    (0b0000000 << 3) | 0b001: InstType.SLLI,
+    (0b0000000 << 3) | 0b101: InstType.SRLI,
+    (0b0100000 << 3) | 0b101: InstType.SRAI,
+}
+I_SHIFT_INST_TYPES: Tuple[Optional[InstType], ...] = tuple(
+    _I_SHIFT_INST_TYPES.get(key) for key in range(1 << 10)
+)
+
+# I-Type Load: funct3 -> type
+_I_LOAD_INST_TYPES: Dict[int, InstType] = {
+    0b000: InstType.LB,
+    0b001: InstType.LH,
+    0b010: InstType.LW,
+    0b100: InstType.LBU,
+    0b101: InstType.LHU,
+}
+I_LOAD_INST_TYPES: Tuple[Optional[InstType], ...] = tuple(
+    _I_LOAD_INST_TYPES.get(key) for key in range(8)
+)
+
+# S-Type: funct3 -> type
+_S_STORE_INST_TYPES: Dict[int, InstType] = {
+    0b000: InstType.SB,
+    0b001: InstType.SH,
+    0b010: InstType.SW,
+}
+S_STORE_INST_TYPES: Tuple[Optional[InstType], ...] = tuple(
+    _S_STORE_INST_TYPES.get(key) for key in range(8)
+)
+
+# B-Type: funct3 -> type
+_B_BRANCH_INST_TYPES: Dict[int, InstType] = {
+    0b000: InstType.BEQ,
+    0b001: InstType.BNE,
+    0b100: InstType.BLT,
+    0b101: InstType.BGE,
+    0b110: InstType.BLTU,
+    0b111: InstType.BGEU,
+}
+B_BRANCH_INST_TYPES: Tuple[Optional[InstType], ...] = tuple(
+    _B_BRANCH_INST_TYPES.get(key) for key in range(8)
+)
+
+# I-Type Environment: imm -> type
+I_ENV_INST_TYPES: Dict[int, InstType] = {
+    0b000: InstType.ECALL,
+    0b001: InstType.EBREAK,
+}
+
+# R-Type Atomic: funct5 -> type
+_R_ATOMIC_INST_TYPES: Dict[int, InstType] = {
+    0b00000: InstType.LR_W,
+    0b00001: InstType.SC_W,
+    0b00010: InstType.AMOSWAP_W,
+    0b00011: InstType.AMOADD_W,
+    0b00100: InstType.AMOAND_W,
+    0b00101: InstType.AMOOR_W,
+    0b00110: InstType.AMOXOR_W,
+    0b00111: InstType.AMOMAX_W,
+    0b01000: InstType.AMOMIN_W,
+}
+R_ATOMIC_INST_TYPES: Tuple[Optional[InstType], ...] = tuple(
+    _R_ATOMIC_INST_TYPES.get(key) for key in range(0x20)
+)
+
+# opcode(raw[6:0]) -> (命令フォーマット, 命令タイプのdecode関数)
+# 未定義のopcodeはNone。IdStage.runでは1回のindexでフォーマットとdecode方法が決まる
+InstTypeDecoder = Callable[[Operand], Optional[InstType]]
+_INST_TYPE_DECODERS: Dict[InstGroup, InstTypeDecoder] = {
+    # NOP=ADDI 0,0,0
+    InstGroup.NOP: lambda op: R_INST_TYPES[(op.r.funct7 << 3) | op.r.funct3],
+    InstGroup.R_ARITHMETIC_LOGICAL_MULTIPLY: lambda op: R_INST_TYPES[
+        (op.r.funct7 << 3) | op.r.funct3
+    ],
+    # shift(funct3=0b001/0b101)のみimm[11:5]も含めて引く
+    InstGroup.I_ARITHMETIC_LOGICAL: lambda op: (
+        I_SHIFT_INST_TYPES[((op.i.imm_11_0 >> 5) << 3) | op.i.funct3]
+        if op.i.funct3 & 0b011 == 0b001
+        else I_ARITHMETIC_INST_TYPES[op.i.funct3]
+    ),
+    InstGroup.I_LOAD: lambda op: I_LOAD_INST_TYPES[op.i.funct3],
+    InstGroup.S_STORE: lambda op: S_STORE_INST_TYPES[op.s.funct3],
+    InstGroup.B_BRANCH: lambda op: B_BRANCH_INST_TYPES[op.b.funct3],
+    InstGroup.U_LUI: lambda op: InstType.LUI,
+    InstGroup.U_AUIPC: lambda op: InstType.AUIPC,
+    InstGroup.J_JAL: lambda op: InstType.JAL,
+    InstGroup.J_JALR: lambda op: InstType.JALR,
+    InstGroup.I_ENV: lambda op: I_ENV_INST_TYPES.get(op.i.imm),
+    InstGroup.R_ATOMIC: lambda op: R_ATOMIC_INST_TYPES[op.atomic.funct5],
+}
+# 命令フォーマット -> 符号拡張済の即値を求める関数 (即値を持たない命令は0)
+ImmDecoder = Callable[[Operand], int]
+_IMM_DECODERS: Dict[InstGroup, ImmDecoder] = {
+    InstGroup.I_ARITHMETIC_LOGICAL: lambda op: op.i.imm_sext,
+    InstGroup.I_LOAD: lambda op: op.i.imm_sext,
+    InstGroup.S_STORE: lambda op: op.s.imm_sext,
+    InstGroup.B_BRANCH: lambda op: op.b_imm_sext,
+    InstGroup.U_LUI: lambda op: op.u.imm,
+    InstGroup.U_AUIPC: lambda op: op.u.imm,
+    InstGroup.J_JAL: lambda op: op.j_imm_sext,
+    InstGroup.J_JALR: lambda op: op.i.imm_sext,
+}
+_OPCODE_DECODERS: Dict[int, Tuple[InstGroup, InstTypeDecoder, ImmDecoder]] = {
+    inst_fmt.value: (inst_fmt, decoder, _IMM_DECODERS.get(inst_fmt, lambda op: 0))
+    for inst_fmt, decoder in _INST_TYPE_DECODERS.items()
+}
+OPCODE_DECODERS: Tuple[Optional[Tuple[InstGroup, InstTypeDecoder, ImmDecoder]], ...] = (
+    tuple(_OPCODE_DECODERS.get(opcode) for opcode in range(0x80))
+)
 
 
 class IdStage:
@@ -356,7 +701,10 @@ class IdStage:
     命令デコードを実行する
     """
 
-    @dataclass
+    # decode cacheのエントリ数 (2の累乗)
+    NUM_DECODE_CACHE_ENTRIES = 4096
+
+    @dataclass(slots=True)
     class Result:
         # IF結果
         fetch_data: IfStage.Result
@@ -366,6 +714,10 @@ class IdStage:
         inst_type: InstType
         # 命令データ
         operand: Operand
+        # 符号拡張済の即値 (フォーマットごとのbit配置はdecode時に解決しておく)
+        imm: int = 0
+        # シフト量 (SLLI/SRLI/SRAIのみ、imm[4:0])
+        shamt: int = 0
 
         def __repr__(self) -> str:
             if self.inst_fmt in [
@@ -373,16 +725,16 @@ class IdStage:
                 InstGroup.R_ARITHMETIC_LOGICAL_MULTIPLY,
             ]:
                 return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type}, rd: {self.operand.r.rd}, rs1: {self.operand.r.rs1}, rs2: {self.operand.r.rs2})"
-            elif self.inst_fmt == InstGroup.I_ARITHMETIC_LOGICAL:
+            elif self.inst_fmt in [InstGroup.I_ARITHMETIC_LOGICAL, InstGroup.I_LOAD]:
                 return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type}, rd: {self.operand.i.rd}, rs1: {self.operand.i.rs1}, imm: {self.operand.i.imm:08x})"
             elif self.inst_fmt == InstGroup.S_STORE:
                 return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type}, rs1: {self.operand.s.rs1}, rs2: {self.operand.s.rs2}, imm: {self.operand.s.imm:08x})"
             elif self.inst_fmt == InstGroup.B_BRANCH:
-                return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type}, rs1: {self.operand.b.rs1}, rs2: {self.operand.b.rs2}, imm: {self.operand.b.imm:08x})"
+                return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type}, rs1: {self.operand.b.rs1}, rs2: {self.operand.b.rs2}, imm: {self.operand.b_imm:08x})"
             elif self.inst_fmt in [InstGroup.U_LUI, InstGroup.U_AUIPC]:
                 return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type}, rd: {self.operand.u.rd}, imm: {self.operand.u.imm:08x})"
             elif self.inst_fmt in [InstGroup.J_JAL, InstGroup.J_JALR]:
-                return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type}, rd: {self.operand.j.rd}, imm: {self.operand.j.imm:08x})"
+                return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type}, rd: {self.operand.j.rd}, imm: {self.operand.j_imm:08x})"
             elif self.inst_fmt == InstGroup.I_ENV:
                 return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type}, imm: {self.operand.i.imm:08x})"
             elif self.inst_fmt == InstGroup.R_ATOMIC:
@@ -390,127 +742,77 @@ class IdStage:
             else:
                 return f"[ID ](fmt: {self.inst_fmt}, type: {self.inst_type})"
 
+    # decode cache: 命令データをtagにしてdecode結果を保持する
+    # 命令データだけで決まる内容なので、全Coreで共有して無効化も不要
+    decode_cache: List[Tuple[SysAddr.DataU32, "IdStage.Result"] | None] = [
+        None
+    ] * NUM_DECODE_CACHE_ENTRIES
+
+    @classmethod
+    def decode_cache_index(cls, raw: SysAddr.DataU32) -> int:
+        """
+        decode cacheのindexを求める
+        下位bitはopcode/rdで偏りやすいので、rs1/rs2/immを含む上位bitをxorで畳み込む
+        (operandだけが違う命令同士が同じentryを取り合わないようにする)
+        """
+        return (raw ^ (raw >> 12) ^ (raw >> 20)) & (cls.NUM_DECODE_CACHE_ENTRIES - 1)
+
     @classmethod
     def run(
         cls, fetch_data: IfStage.Result
     ) -> Tuple[Optional["IdStage.Result"], ExceptionCode | None]:
+        # decode cache hit: PC(fetch_data)以外はそのまま使える
+        cache_idx = cls.decode_cache_index(fetch_data.raw)
+        cache_entry = cls.decode_cache[cache_idx]
+        if cache_entry is not None and cache_entry[0] == fetch_data.raw:
+            cached = cache_entry[1]
+            return cls.Result(
+                fetch_data=fetch_data,
+                inst_fmt=cached.inst_fmt,
+                inst_type=cached.inst_type,
+                operand=cached.operand,
+                imm=cached.imm,
+                shamt=cached.shamt,
+            ), None
+
         # 命令デコード
-        decode_data = Operand()
-        decode_data.raw = fetch_data.raw
-        # 命令フォーマット/タイプ
-        inst_type: InstType | None = None
-        inst_fmt = InstGroup(decode_data.common.opcode)
-        if inst_fmt in [
-            InstGroup.NOP,
-            InstGroup.R_ARITHMETIC_LOGICAL_MULTIPLY,
-        ]:  # NOP=ADDI 0,0,0
-            # funct3 -> (funct7 -> type)
-            table: Dict[int, Dict[int, InstType]] = {
-                0b000: {0b0000000: InstType.ADD, 0b0100000: InstType.SUB},
-                0b001: {0b0000000: InstType.SLL},
-                0b010: {0b0000000: InstType.SLT},
-                0b011: {0b0000000: InstType.SLTU},
-                0b100: {0b0000000: InstType.XOR},
-                0b101: {0b0000000: InstType.SRL, 0b0100000: InstType.SRA},
-                0b110: {0b0000000: InstType.OR},
-                0b111: {0b0000000: InstType.AND},
-            }
-            inst_type = table.get(decode_data.r.funct3, {}).get(
-                decode_data.r.funct7, None
+        decode_data = Operand(fetch_data.raw)
+        # 命令フォーマット/タイプ: opcodeで引いたdecode関数でtypeを決める
+        decoder = OPCODE_DECODERS[decode_data.common.opcode]
+        if decoder is None:
+            logging.warning(
+                "Unknown instruction format: decode_data.common.opcode=%r",
+                decode_data.common.opcode,
             )
-        elif inst_fmt == InstGroup.I_ARITHMETIC_LOGICAL:
-            # funct3 -> (imm[11:5] -> type)
-            imm_11_5 = decode_data.i.imm_11_0 >> 5
-            table: Dict[int, Callable[InstType]] = {
-                0b000: lambda: InstType.ADDI,
-                0b001: lambda: InstType.SLLI,
-                0b010: lambda: InstType.SLTI,
-                0b011: lambda: InstType.SLTIU,
-                0b100: lambda: InstType.XORI,
-                0b101: lambda: InstType.SRLI if imm_11_5 == 0 else InstType.SRAI,
-                0b110: lambda: InstType.ORI,
-                0b111: lambda: InstType.ANDI,
-            }
-            inst_type = table.get(decode_data.i.funct3, lambda x: None)()
-        elif inst_fmt == InstGroup.S_STORE:
-            # funct3 -> type
-            table: Dict[int, InstType] = {
-                0b000: InstType.SB,
-                0b001: InstType.SH,
-                0b010: InstType.SW,
-            }
-            inst_type = table.get(decode_data.s.funct3, None)
-        elif inst_fmt == InstGroup.B_BRANCH:
-            # funct3 -> type
-            table: Dict[int, InstType] = {
-                0b000: InstType.BEQ,
-                0b001: InstType.BNE,
-                0b100: InstType.BLT,
-                0b101: InstType.BGE,
-                0b110: InstType.BLTU,
-                0b111: InstType.BGEU,
-            }
-            inst_type = table.get(decode_data.b.funct3, None)
-        elif inst_fmt in [InstGroup.U_LUI, InstGroup.U_AUIPC]:
-            # opcode -> type
-            table: Dict[int, InstType] = {
-                InstGroup.U_LUI: InstType.LUI,
-                InstGroup.U_AUIPC: InstType.AUIPC,
-            }
-            inst_type = table.get(inst_fmt, None)
-        elif inst_fmt in [InstGroup.J_JAL, InstGroup.J_JALR]:
-            # opcode -> type
-            table: Dict[int, InstType] = {
-                InstGroup.J_JAL: InstType.JAL,
-                InstGroup.J_JALR: InstType.JALR,
-            }
-            inst_type = table.get(inst_fmt, None)
-        elif inst_fmt == InstGroup.I_ENV:
-            # imm -> type
-            table: Dict[int, InstType] = {
-                0b000: InstType.ECALL,
-                0b001: InstType.EBREAK,
-            }
-            inst_type = table.get(decode_data.i.imm)
-        elif inst_fmt == InstGroup.R_ATOMIC:
-            # funct5 -> type
-            table: Dict[int, InstType] = {
-                0b00000: InstType.LR_W,
-                0b00001: InstType.SC_W,
-                0b00010: InstType.AMOSWAP_W,
-                0b00011: InstType.AMOADD_W,
-                0b00100: InstType.AMOAND_W,
-                0b00101: InstType.AMOOR_W,
-                0b00110: InstType.AMOXOR_W,
-                0b00111: InstType.AMOMAX_W,
-                0b01000: InstType.AMOMIN_W,
-            }
-            inst_type = table.get(decode_data.atomic.funct5, None)
-        else:
-            logging.warning(f"Unknown instruction format: {inst_fmt=}")
             return None, ExceptionCode.ILLEGAL_INST
-
-        if inst_type is None or inst_type not in InstType:
-            logging.warning(f"Unknown instruction type: {inst_type=}")
+        inst_fmt, decode_inst_type, decode_imm = decoder
+        inst_type = decode_inst_type(decode_data)
+        if inst_type is None:
+            logging.warning("Unknown instruction type: inst_fmt=%r", inst_fmt)
             return None, ExceptionCode.ILLEGAL_INST
 
-        return cls.Result(
+        # shift系はimm[4:0]だけが有効なので、ここでmaskしておく
+        shamt = 0
+        if inst_type in (InstType.SLLI, InstType.SRLI, InstType.SRAI):
+            shamt = decode_data.i.imm_11_0 & 0x1F
+
+        id_data = cls.Result(
             fetch_data=fetch_data,
             inst_fmt=inst_fmt,
             inst_type=inst_type,
             operand=decode_data,
-        ), None
+            imm=decode_imm(decode_data),
+            shamt=shamt,
+        )
+        cls.decode_cache[cache_idx] = (fetch_data.raw, id_data)
+        return id_data, None
 
 
-@dataclass
-class ReadRegResult:
-    rs1: int
-    rs2: int
-    rs1_sext: int
-    rs2_sext: int
+# レジスタ番号ごとの書き込みmask。x0だけ0にしておく
+REG_WRITE_MASKS: Final = (0,) + (MASK32,) * 31
 
 
-@dataclass
+@dataclass(slots=True)
 class RegFile:
     """
     Register file
@@ -522,56 +824,34 @@ class RegFile:
     def clear(self) -> None:
         """
         Clear all registers
+        listを作り直さずにその場で0埋めする (self.regsへの参照を持っている側もそのまま使える)
         """
-        self.regs = [0] * 32
+        self.regs[:] = [0] * 32
 
-    def read(
-        self, addr: SysAddr.AddrU32
-    ) -> Tuple[SysAddr.DataU32, ExceptionCode | None]:
+    def read(self, addr: SysAddr.AddrU32) -> SysAddr.DataU32:
         """
         Read a register
+        zero registerはwriteで書き換わらないので常に0が読める
         """
-        assert 0 <= addr < 32, f"Invalid register address: {addr=}"
-        # zero register
-        if addr == 0:
-            return 0, None
-        return self.regs[addr], None
-
-    def write(
-        self, addr: SysAddr.AddrU32, data: SysAddr.DataU32
-    ) -> ExceptionCode | None:
+        return self.regs[addr]
+
+    def write(self, addr: SysAddr.AddrU32, data: SysAddr.DataU32) -> None:
         """
         Write a register
+        レジスタは常にuint32として保持する (符号付きの演算結果もここで32bitに丸める)
+        addrは命令の5bit fieldから取り出した値なので範囲外にはならない
         """
-        assert 0 <= addr < 32, f"Invalid register address: {addr=}"
-        # zero register
-        if addr == 0:
-            return None
-        self.regs[addr] = data
-        return None
+        # zero registerはmask=0で常に0が書かれるので、分岐せずに書き込む
+        self.regs[addr] = data & REG_WRITE_MASKS[addr]
 
-    def read_srcregs(
-        self, rs1_idx: int, rs2_idx: int
-    ) -> Tuple[ReadRegResult | None, ExceptionCode | None]:
-        # read rs1, rs2
-        rs1, rs1_ex = self.read(rs1_idx)
-        if rs1_ex is not None:
-            logging.warning(f"Failed to read rs1: {rs1_ex=}")
-            return None, rs1_ex
-        rs2, rs2_ex = self.read(rs2_idx)
-        if rs2_ex is not None:
-            logging.warning(f"Failed to read rs2: {rs2_ex=}")
-            return None, rs2_ex
-        # sign extend rs1/rs2
-        rs1 = Calc.sign_extend(data=rs1, num_bit_width=32)
-        rs2 = Calc.sign_extend(data=rs2, num_bit_width=32)
-
-        return ReadRegResult(
-            rs1=rs1,
-            rs2=rs2,
-            rs1_sext=rs1,
-            rs2_sext=rs2,
-        ), None
+    def read_srcregs(self, rs1_idx: int, rs2_idx: int) -> Tuple[int, int]:
+        """
+        Read source registers
+        (rs1, rs2) をuint32のままtupleで返す
+        符号付きの演算が必要な命令は、各演算関数の中でsign extendする
+        """
+        regs = self.regs
+        return regs[rs1_idx], regs[rs2_idx]
 
 
 @enum.unique
@@ -595,12 +875,134 @@ class AfterExAction(enum.Flag):
         return cls(0)
 
 
+# 複数アクションの組み合わせ。Flagの | は毎回新しい値の解決が走るので先に作っておく
+AFTER_EX_LOAD_WRITEBACK: Final = AfterExAction.LOAD | AfterExAction.WRITEBACK
+AFTER_EX_BRANCH_WRITEBACK: Final = AfterExAction.BRANCH | AfterExAction.WRITEBACK
+
+
+def _div_trunc(dividend: int, divisor: int) -> int:
+    """
+    0方向に丸める符号付き除算
+    Pythonの//は-∞方向に丸めるので、絶対値で割ってから符号を付け直す
+    """
+    quotient = abs(dividend) // abs(divisor)
+    return -quotient if (dividend < 0) != (divisor < 0) else quotient
+
+
+def _rem_trunc(dividend: int, divisor: int) -> int:
+    """
+    0方向に丸める符号付き剰余 (符号は被除数に合わせる)
+    """
+    return dividend - divisor * _div_trunc(dividend, divisor)
+
+
+# 演算命令の実行テーブル
+# ExStageで命令ごとにdict/lambdaを作り直さないように、InstTypeの値をindexにしたtupleを1度だけ作る
+# 引数はuint32のレジスタ値そのまま。符号付きの演算は (x ^ SIGN_BIT32) - SIGN_BIT32 で都度sign extendする
+_R_ARITHMETIC_FUNCS: Dict[InstType, Callable[[int, int], int]] = {
+    # Base Integer
+    InstType.ADD: lambda rs1, rs2: rs1 + rs2,
+    InstType.SUB: lambda rs1, rs2: rs1 - rs2,
+    InstType.XOR: lambda rs1, rs2: rs1 ^ rs2,
+    InstType.OR: lambda rs1, rs2: rs1 | rs2,
+    InstType.AND: lambda rs1, rs2: rs1 & rs2,
+    InstType.SLL: lambda rs1, rs2: rs1 << (rs2 & 0x1F),
+    InstType.SRL: lambda rs1, rs2: rs1 >> (rs2 & 0x1F),
+    InstType.SRA: lambda rs1, rs2: ((rs1 ^ SIGN_BIT32) - SIGN_BIT32) >> (rs2 & 0x1F),
+    InstType.SLT: lambda rs1, rs2: (
+        ((rs1 ^ SIGN_BIT32) - SIGN_BIT32) < ((rs2 ^ SIGN_BIT32) - SIGN_BIT32)
+    ),
+    InstType.SLTU: lambda rs1, rs2: rs1 < rs2,
+    # Multiply Extension
+    InstType.MUL: lambda rs1, rs2: rs1 * rs2,
+    InstType.MULH: lambda rs1, rs2: (
+        (((rs1 ^ SIGN_BIT32) - SIGN_BIT32) * ((rs2 ^ SIGN_BIT32) - SIGN_BIT32))
+        >> SysAddr.NUM_WORD_BITS
+    ),
+    InstType.MULSU: lambda rs1, rs2: (
+        (((rs1 ^ SIGN_BIT32) - SIGN_BIT32) * rs2) >> SysAddr.NUM_WORD_BITS
+    ),
+    InstType.MULU: lambda rs1, rs2: (rs1 * rs2) >> SysAddr.NUM_WORD_BITS,
+    # 0除算は例外にならず、商は全bit 1、余りは被除数になる
+    # 0除算の判定はここでの1回だけにして、例外判定などは別に持たない
+    InstType.DIV: lambda rs1, rs2: (
+        _div_trunc((rs1 ^ SIGN_BIT32) - SIGN_BIT32, (rs2 ^ SIGN_BIT32) - SIGN_BIT32)
+        if rs2 != 0
+        else MASK32
+    ),
+    InstType.DIVU: lambda rs1, rs2: rs1 // rs2 if rs2 != 0 else MASK32,
+    InstType.REM: lambda rs1, rs2: (
+        _rem_trunc((rs1 ^ SIGN_BIT32) - SIGN_BIT32, (rs2 ^ SIGN_BIT32) - SIGN_BIT32)
+        if rs2 != 0
+        else rs1
+    ),
+    InstType.REMU: lambda rs1, rs2: rs1 % rs2 if rs2 != 0 else rs1,
+}
+R_ARITHMETIC_FUNCS: Tuple[Optional[Callable[[int, int], int]], ...] = tuple(
+    _R_ARITHMETIC_FUNCS.get(inst_type) for inst_type in range(max(InstType) + 1)
+)
+
+_I_ARITHMETIC_FUNCS: Dict[InstType, Callable[[int, IdStage.Result], int]] = {
+    InstType.ADDI: lambda rs1, inst: rs1 + inst.imm,
+    InstType.SLLI: lambda rs1, inst: rs1 << inst.shamt,
+    InstType.SLTI: lambda rs1, inst: ((rs1 ^ SIGN_BIT32) - SIGN_BIT32) < inst.imm,
+    # 符号拡張したimmをunsignedとして比較する
+    InstType.SLTIU: lambda rs1, inst: rs1 < (inst.imm & MASK32),
+    # 負のimmとの論理演算結果は書き戻し時のmaskで32bitに戻る
+    InstType.XORI: lambda rs1, inst: rs1 ^ inst.imm,
+    InstType.SRLI: lambda rs1, inst: rs1 >> inst.shamt,
+    InstType.SRAI: lambda rs1, inst: ((rs1 ^ SIGN_BIT32) - SIGN_BIT32) >> inst.shamt,
+    InstType.ORI: lambda rs1, inst: rs1 | inst.imm,
+    InstType.ANDI: lambda rs1, inst: rs1 & inst.imm,
+}
+I_ARITHMETIC_FUNCS: Tuple[Optional[Callable[[int, IdStage.Result], int]], ...] = tuple(
+    _I_ARITHMETIC_FUNCS.get(inst_type) for inst_type in range(max(InstType) + 1)
+)
+
+# 分岐命令の条件判定: inst_type -> func[[rs1, rs2] -> branch_cond]
+_B_BRANCH_CONDS: Dict[InstType, Callable[[int, int], bool]] = {
+    InstType.BEQ: lambda rs1, rs2: rs1 == rs2,
+    InstType.BNE: lambda rs1, rs2: rs1 != rs2,
+    # 符号bitを反転すればunsignedの大小比較が符号付きの比較と一致する
+    InstType.BLT: lambda rs1, rs2: (rs1 ^ SIGN_BIT32) < (rs2 ^ SIGN_BIT32),
+    InstType.BGE: lambda rs1, rs2: (rs1 ^ SIGN_BIT32) >= (rs2 ^ SIGN_BIT32),
+    InstType.BLTU: lambda rs1, rs2: rs1 < rs2,
+    InstType.BGEU: lambda rs1, rs2: rs1 >= rs2,
+}
+B_BRANCH_CONDS: Tuple[Optional[Callable[[int, int], bool]], ...] = tuple(
+    _B_BRANCH_CONDS.get(inst_type) for inst_type in range(max(InstType) + 1)
+)
+
+# Load命令のアクセスサイズと符号bit: inst_type -> (num_en_bytes, sign_bit)
+# 読み出したデータは (data ^ sign_bit) - sign_bit で符号拡張する (unsignedは0で何もしない)
+_I_LOAD_OPS: Dict[InstType, Tuple[int, int]] = {
+    InstType.LB: (1, 0x80),
+    InstType.LH: (2, 0x8000),
+    InstType.LW: (4, 0),
+    InstType.LBU: (1, 0),
+    InstType.LHU: (2, 0),
+}
+I_LOAD_OPS: Tuple[Optional[Tuple[int, int]], ...] = tuple(
+    _I_LOAD_OPS.get(inst_type) for inst_type in range(max(InstType) + 1)
+)
+
+# Store命令のアクセスサイズと書き込みデータのmask: inst_type -> (num_en_bytes, mask)
+_S_STORE_OPS: Dict[InstType, Tuple[int, int]] = {
+    InstType.SB: (1, 0xFF),
+    InstType.SH: (2, 0xFFFF),
+    InstType.SW: (4, MASK32),
+}
+S_STORE_OPS: Tuple[Optional[Tuple[int, int]], ...] = tuple(
+    _S_STORE_OPS.get(inst_type) for inst_type in range(max(InstType) + 1)
+)
+
+
 class ExStage:
     """
     命令実行
     """
 
-    @dataclass
+    @dataclass(slots=True)
     class Result:
         # if/id result
         decode_data: IdStage.Result
@@ -613,21 +1015,26 @@ class ExStage:
         mem_addr: Optional[int] = None
         mem_size: Optional[int] = None
         mem_data: Optional[int] = None
+        # Loadしたデータの符号bit (符号拡張しない場合は0)
+        load_sign_bit: int = 0
         # EX stage (BRANCH)
         branch_addr: Optional[int] = None
         branch_cond: Optional[bool] = None
 
         def __repr__(self) -> str:
             repr_str = f"[EX ](action: {self.action_bits}"
-            if self.action_bits & AfterExAction.WRITEBACK:
+            if self.action_bits & AfterExAction.LOAD:
+                # 書き戻すデータはMEM stageで決まる
+                assert self.writeback_idx is not None
+                assert self.mem_addr is not None
+                assert self.mem_size is not None
+                repr_str += f", rd: {self.writeback_idx}, mem_addr: 0x{self.mem_addr:08x}, mem_size: {self.mem_size}"
+            elif self.action_bits & AfterExAction.WRITEBACK:
                 assert self.writeback_idx is not None
                 assert self.writeback_data is not None
                 repr_str += (
                     f", rd: {self.writeback_idx}, data: 0x{self.writeback_data:08x}"
                 )
-            if self.action_bits & AfterExAction.LOAD:
-                assert self.writeback_idx is not None
-                repr_str += f", rd: {self.writeback_idx}"
             if self.action_bits & AfterExAction.STORE:
                 assert self.mem_addr is not None
                 assert self.mem_size is not None
@@ -640,292 +1047,105 @@ class ExStage:
             repr_str += ")"
             return repr_str
 
-    @dataclass
-    class ArithmeticLogicalOp:
-        # 計算結果を返す
-        compute_result: Callable[[], SysAddr.DataU32]
-        check_exception: Callable[[], ExceptionCode | None] = lambda: None
-
-    @dataclass
-    class LoadOp:
-        # Load先
-        mem_addr: Callable[[], SysAddr.DataU32]
-        # Load Size
-        mem_size: Callable[[], SysAddr.DataU32]
-
-    @dataclass
-    class StoreOp:
-        # Store先
-        mem_addr: Callable[[], SysAddr.DataU32]
-        # Store Size
-        mem_size: Callable[[], SysAddr.DataU32]
-        # Store Data
-        store_data: Callable[[], SysAddr.DataU32]
-
-    @dataclass
-    class BranchOp:
-        # Branch先
-        branch_addr: Callable[[], SysAddr.DataU32]
-        # branch条件成立
-        branch_cond: Callable[[], bool]
-
     @classmethod
     def _run_r_arithmetic(
         cls, decode_data: IdStage.Result, reg_file: RegFile
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
         # read rs1, rs2
-        src_regs, regs_ex = reg_file.read_srcregs(
-            rs1_idx=decode_data.operand.r.rs1, rs2_idx=decode_data.operand.r.rs2
-        )
-        if regs_ex is not None:
-            return None, regs_ex
-        rd_data = 0
-        # 命令ごと分岐: inst_type -> func[[] -> rd_data]
-        table: Dict[InstType, ExStage.ArithmeticLogicalOp] = {
-            # Base Integer
-            InstType.ADD: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1_sext + src_regs.rs2_sext,
-            ),
-            InstType.SUB: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1_sext - src_regs.rs2_sext,
-            ),
-            InstType.XOR: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 ^ src_regs.rs2
-            ),
-            InstType.OR: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 | src_regs.rs2
-            ),
-            InstType.AND: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 & src_regs.rs2
-            ),
-            InstType.SLL: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1_sext << src_regs.rs2_sext,
-            ),
-            InstType.SRL: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 >> src_regs.rs2
-            ),
-            InstType.SRA: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1_sext >> src_regs.rs2,
-            ),
-            InstType.SLT: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1_sext < src_regs.rs2_sext,
-            ),
-            InstType.SLTU: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 < src_regs.rs2
-            ),
-            # Multiply Extension
-            InstType.MUL: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1_sext * src_regs.rs2_sext
-            ),
-            InstType.MULH: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: (src_regs.rs1_sext * src_regs.rs2_sext)
-                >> SysAddr.NUM_WORD_BITS,
-            ),
-            InstType.MULSU: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: (src_regs.rs1 * src_regs.rs2_sext)
-                >> SysAddr.NUM_WORD_BITS,
-            ),
-            InstType.MULU: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: (src_regs.rs1 * src_regs.rs2)
-                >> SysAddr.NUM_WORD_BITS,
-            ),
-            InstType.DIV: ExStage.ArithmeticLogicalOp(
-                check_exception=(lambda: None)
-                if src_regs.rs2_sext != 0
-                else ExceptionCode.ILLEGAL_INST,
-                compute_result=lambda: src_regs.rs1_sext // src_regs.rs2_sext
-                if src_regs.rs2_sext != 0
-                else 0xFFFFFFFF,
-            ),
-            InstType.DIVU: ExStage.ArithmeticLogicalOp(
-                check_exception=(lambda: None)
-                if src_regs.rs2 != 0
-                else ExceptionCode.ILLEGAL_INST,
-                compute_result=lambda: src_regs.rs1 // src_regs.rs2
-                if src_regs.rs2 != 0
-                else 0xFFFFFFFF,
-            ),
-            InstType.REM: ExStage.ArithmeticLogicalOp(
-                check_exception=(lambda: None)
-                if src_regs.rs2_sext != 0
-                else ExceptionCode.ILLEGAL_INST,
-                compute_result=lambda: src_regs.rs1_sext % src_regs.rs2_sext
-                if src_regs.rs2_sext != 0
-                else src_regs.rs1_sext,
-            ),
-            InstType.REMU: ExStage.ArithmeticLogicalOp(
-                check_exception=(lambda: None)
-                if src_regs.rs2 != 0
-                else ExceptionCode.ILLEGAL_INST,
-                compute_result=lambda: src_regs.rs1 % src_regs.rs2
-                if src_regs.rs2 != 0
-                else src_regs.rs1,
-            ),
-        }
-        al_op = table.get(decode_data.inst_type, None)
-        if al_op is None:
+        operand = decode_data.operand.r
+        rs1, rs2 = reg_file.read_srcregs(rs1_idx=operand.rs1, rs2_idx=operand.rs2)
+        # 命令ごと分岐: inst_type -> func[[rs1, rs2] -> rd_data]
+        compute_result = R_ARITHMETIC_FUNCS[decode_data.inst_type]
+        if compute_result is None:
             # Decodeできていればここには来ないはず
-            logging.warning(f"Unknown instruction type: {decode_data.r.funct3=}")
+            logging.warning(
+                "Unknown instruction type: decode_data.inst_type=%r",
+                decode_data.inst_type,
+            )
             return None, ExceptionCode.ILLEGAL_INST
-        # shiftrやaddで超えるケースがあるのでmask
-        rd_data &= (1 << SysAddr.NUM_WORD_BITS) - 1
         # WB stageでの書き戻しのみ指定
         return ExStage.Result(
             decode_data=decode_data.fetch_data,
             action_bits=AfterExAction.WRITEBACK,
-            writeback_idx=decode_data.operand.r.rd,
-            writeback_data=al_op.compute_result(),
-        ), al_op.check_exception()
+            writeback_idx=operand.rd,
+            # shiftやaddで32bitを超えるケースがあるのでmask
+            writeback_data=compute_result(rs1, rs2) & MASK32,
+        ), None
 
     @classmethod
     def _run_i_arithmetic(
         cls, decode_data: IdStage.Result, reg_file: RegFile
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
         # read rs1
-        src_regs, regs_ex = reg_file.read_srcregs(
-            rs1_idx=decode_data.operand.i.rs1, rs2_idx=0
-        )
-        if regs_ex is not None:
-            return None, regs_ex
-        rd_data = 0
-        # 命令ごと分岐: inst_type -> func[[] -> rd_data]
-        table: Dict[InstType, ExStage.ArithmeticLogicalOp] = {
-            # Base Integer
-            InstType.ADDI: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1_sext
-                + decode_data.operand.i.imm_sext,
-            ),
-            InstType.SLLI: ExStage.ArithmeticLogicalOp(
-                check_exception=lambda: None,
-                compute_result=lambda: src_regs.rs1_sext << decode_data.operand.i.imm,
-            ),
-            InstType.SLTI: ExStage.ArithmeticLogicalOp(
-                check_exception=lambda: None,
-                compute_result=lambda: src_regs.rs1_sext
-                < decode_data.operand.i.imm_sext,
-            ),
-            InstType.SLTIU: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 < decode_data.operand.i.imm,
-            ),
-            InstType.XORI: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 ^ decode_data.operand.i.imm,
-            ),
-            InstType.SRLI: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 >> decode_data.operand.i.imm,
-            ),
-            InstType.SRAI: ExStage.ArithmeticLogicalOp(
-                check_exception=lambda: None,
-                compute_result=lambda: src_regs.rs1_sext >> decode_data.operand.i.imm,
-            ),
-            InstType.ORI: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 | decode_data.operand.i.imm,
-            ),
-            InstType.ANDI: ExStage.ArithmeticLogicalOp(
-                compute_result=lambda: src_regs.rs1 & decode_data.operand.i.imm,
-            ),
-        }
-        al_op = table.get(decode_data.inst_type, None)
-        if al_op is None:
+        operand = decode_data.operand.i
+        rs1 = reg_file.regs[operand.rs1]
+        # 命令ごと分岐: inst_type -> func[[rs1, decode_data] -> rd_data]
+        compute_result = I_ARITHMETIC_FUNCS[decode_data.inst_type]
+        if compute_result is None:
             # Decodeできていればここには来ないはず
-            logging.warning(f"Unknown instruction type: {decode_data.i.funct3=}")
+            logging.warning(
+                "Unknown instruction type: decode_data.inst_type=%r",
+                decode_data.inst_type,
+            )
             return None, ExceptionCode.ILLEGAL_INST
         # WB stageでの書き戻しのみ指定
         return ExStage.Result(
             decode_data=decode_data.fetch_data,
             action_bits=AfterExAction.WRITEBACK,
-            writeback_idx=decode_data.operand.i.rd,
-            writeback_data=al_op.compute_result(),
-        ), al_op.check_exception()
+            writeback_idx=operand.rd,
+            # shiftやaddで32bitを超えるケースがあるのでmask
+            writeback_data=compute_result(rs1, decode_data) & MASK32,
+        ), None
 
     @classmethod
     def _run_i_load(
         cls, decode_data: IdStage.Result, reg_file: RegFile
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
-        # read rs1
-        src_regs, regs_ex = reg_file.read_srcregs(
-            rs1_idx=decode_data.operand.i.rs1, rs2_idx=0
-        )
-        if regs_ex is not None:
-            # rs1 read error
-            return None, regs_ex
-
-        # mem sizeは命令で分岐
-        table: Dict[InstType, ExStage.LoadOp] = {
-            InstType.LB: ExStage.LoadOp(
-                mem_addr=lambda: src_regs.rs1 + decode_data.operand.i.imm_sext,
-                mem_size=lambda: 1,
-            ),
-            InstType.LH: ExStage.LoadOp(
-                mem_addr=lambda: src_regs.rs1 + decode_data.operand.i.imm_sext,
-                mem_size=lambda: 2,
-            ),
-            InstType.LW: ExStage.LoadOp(
-                mem_addr=lambda: src_regs.rs1 + decode_data.operand.i.imm_sext,
-                mem_size=lambda: 4,
-            ),
-            InstType.LBU: ExStage.LoadOp(
-                mem_addr=lambda: src_regs.rs1 + decode_data.operand.i.imm_sext,
-                mem_size=lambda: 1,
-            ),
-            InstType.LHU: ExStage.LoadOp(
-                mem_addr=lambda: src_regs.rs1 + decode_data.operand.i.imm_sext,
-                mem_size=lambda: 2,
-            ),
-        }
-        load_op = table.get(decode_data.inst_type, None)
+        # mem size, 符号拡張の有無は命令で分岐
+        load_op = I_LOAD_OPS[decode_data.inst_type]
         if load_op is None:
             # Decodeできていればここには来ないはず
-            logging.warning(f"Unknown instruction type: {decode_data.i.funct3=}")
+            logging.warning(
+                "Unknown instruction type: decode_data.inst_type=%r",
+                decode_data.inst_type,
+            )
             return None, ExceptionCode.ILLEGAL_INST
+        mem_size, load_sign_bit = load_op
         # MEM stageでの読み出しを指定
+        operand = decode_data.operand.i
         return ExStage.Result(
             decode_data=decode_data.fetch_data,
-            action_bits=AfterExAction.LOAD | AfterExAction.WRITEBACK,
-            mem_addr=load_op.mem_addr(),
-            mem_size=load_op.mem_addr(),
-            writeback_idx=decode_data.operand.i.rd,
+            action_bits=AFTER_EX_LOAD_WRITEBACK,
+            mem_addr=(reg_file.regs[operand.rs1] + decode_data.imm) & MASK32,
+            mem_size=mem_size,
+            load_sign_bit=load_sign_bit,
+            writeback_idx=operand.rd,
             writeback_data=None,  # MEM stageで決定
         ), None
 
+    @classmethod
     def _run_s_store(
         cls, decode_data: IdStage.Result, reg_file: RegFile
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
-        # read rs1, rs2
-        src_regs, regs_ex = reg_file.read_srcregs(
-            rs1_idx=decode_data.operand.s.rs1, rs2_idx=decode_data.operand.s.rs2
-        )
-        if regs_ex is not None:
-            return None, regs_ex
-        # MEM stageで実行する内容を決定
-        table: Dict[InstType, ExStage.StoreOp] = {
-            InstType.SB: ExStage.StoreOp(
-                mem_addr=lambda: src_regs.rs1 + decode_data.operand.s.imm_sext,
-                mem_size=lambda: 1,
-                store_data=lambda: src_regs.rs2 & 0xFF,
-            ),
-            InstType.SH: ExStage.StoreOp(
-                mem_addr=lambda: src_regs.rs1 + decode_data.operand.s.imm_sext,
-                mem_size=lambda: 2,
-                store_data=lambda: src_regs.rs2 & 0xFFFF,
-            ),
-            InstType.SW: ExStage.StoreOp(
-                mem_addr=lambda: src_regs.rs1 + decode_data.operand.s.imm_sext,
-                mem_size=lambda: 4,
-                store_data=lambda: src_regs.rs2 & 0xFFFFFFFF,
-            ),
-        }
-        store_op = table.get(decode_data.inst_type, None)
+        # mem size, store dataのmaskは命令で分岐
+        store_op = S_STORE_OPS[decode_data.inst_type]
         if store_op is None:
             # Decodeできていればここには来ないはず
-            logging.warning(f"Unknown instruction type: {decode_data.s.funct3=}")
+            logging.warning(
+                "Unknown instruction type: decode_data.inst_type=%r",
+                decode_data.inst_type,
+            )
             return None, ExceptionCode.ILLEGAL_INST
+        mem_size, store_data_mask = store_op
         # MEM stageでの書き込みを指定
+        regs = reg_file.regs
+        operand = decode_data.operand.s
         return ExStage.Result(
             decode_data=decode_data.fetch_data,
             action_bits=AfterExAction.STORE,
-            mem_addr=store_op.mem_addr(),
-            mem_size=store_op.mem_size(),
-            mem_data=store_op.store_data(),
+            mem_addr=(regs[operand.rs1] + decode_data.imm) & MASK32,
+            mem_size=mem_size,
+            mem_data=regs[operand.rs2] & store_data_mask,
         ), None
 
     @classmethod
@@ -933,56 +1153,24 @@ class ExStage:
         cls, decode_data: IdStage.Result, reg_file: RegFile
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
         # read rs1, rs2
-        src_regs, regs_ex = reg_file.read_srcregs(
-            rs1_idx=decode_data.operand.b.rs1, rs2_idx=decode_data.operand.b.rs2
-        )
-        if regs_ex is not None:
-            return None, regs_ex
-        # Branch条件成立
-        table: Dict[InstType, ExStage.BranchOp] = {
-            InstType.BEQ: ExStage.BranchOp(
-                branch_addr=lambda: decode_data.fetch_data.pc
-                + decode_data.operand.b.imm_sext,
-                branch_cond=lambda: src_regs.rs1 == src_regs.rs2,
-            ),
-            InstType.BNE: ExStage.BranchOp(
-                branch_addr=lambda: decode_data.fetch_data.pc
-                + decode_data.operand.b.imm_sext,
-                branch_cond=lambda: src_regs.rs1 != src_regs.rs2,
-            ),
-            InstType.BLT: ExStage.BranchOp(
-                branch_addr=lambda: decode_data.fetch_data.pc
-                + decode_data.operand.b.imm_sext,
-                branch_cond=lambda: src_regs.rs1 < src_regs.rs2,
-            ),
-            InstType.BGE: ExStage.BranchOp(
-                branch_addr=lambda: decode_data.fetch_data.pc
-                + decode_data.operand.b.imm_sext,
-                branch_cond=lambda: src_regs.rs1 >= src_regs.rs2,
-            ),
-            InstType.BLTU: ExStage.BranchOp(
-                branch_addr=lambda: decode_data.fetch_data.pc
-                + decode_data.operand.b.imm,
-                branch_cond=lambda: src_regs.rs1 < src_regs.rs2,
-            ),
-            InstType.BGEU: ExStage.BranchOp(
-                branch_addr=lambda: decode_data.fetch_data.pc
-                + decode_data.operand.b.imm,
-                branch_cond=lambda: src_regs.rs1 >= src_regs.rs2,
-            ),
-        }
-        branch_op = table.get(decode_data.inst_type, None)
-        if branch_op is None:
+        operand = decode_data.operand.b
+        rs1, rs2 = reg_file.read_srcregs(rs1_idx=operand.rs1, rs2_idx=operand.rs2)
+        # 命令ごと分岐: inst_type -> func[[rs1, rs2] -> branch_cond]
+        branch_cond = B_BRANCH_CONDS[decode_data.inst_type]
+        if branch_cond is None:
             # Decodeできていればここには来ないはず
-            logging.warning(f"Unknown instruction type: {decode_data.b.funct3=}")
+            logging.warning(
+                "Unknown instruction type: decode_data.inst_type=%r",
+                decode_data.inst_type,
+            )
             return None, ExceptionCode.ILLEGAL_INST
 
         # Branch条件成立有無と次のPCを返す
         return ExStage.Result(
             decode_data=decode_data.fetch_data,
             action_bits=AfterExAction.BRANCH,
-            branch_addr=branch_op.branch_addr(),
-            branch_cond=branch_op.branch_cond(),
+            branch_addr=(decode_data.fetch_data.pc + decode_data.imm) & MASK32,
+            branch_cond=branch_cond(rs1, rs2),
         ), None
 
     @classmethod
@@ -990,12 +1178,11 @@ class ExStage:
         cls, decode_data: IdStage.Result, reg_file: RegFile
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
         # LUI: rd = imm[31:12]
-        imm = decode_data.operand.u.imm << 12
         return ExStage.Result(
             decode_data=decode_data.fetch_data,
             action_bits=AfterExAction.WRITEBACK,
             writeback_idx=decode_data.operand.u.rd,
-            writeback_data=imm,
+            writeback_data=decode_data.imm,
         ), None
 
     @classmethod
@@ -1003,12 +1190,11 @@ class ExStage:
         cls, decode_data: IdStage.Result, reg_file: RegFile
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
         # AUIPC: rd = pc + imm[31:12]
-        imm = decode_data.operand.u.imm << 12
         return ExStage.Result(
             decode_data=decode_data.fetch_data,
             action_bits=AfterExAction.WRITEBACK,
             writeback_idx=decode_data.operand.u.rd,
-            writeback_data=decode_data.fetch_data.pc + imm,
+            writeback_data=(decode_data.fetch_data.pc + decode_data.imm) & MASK32,
         ), None
 
     @classmethod
@@ -1016,13 +1202,14 @@ class ExStage:
         cls, decode_data: IdStage.Result, reg_file: RegFile
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
         # JAL: rd = pc + 4, pc = pc + imm
-        imm = decode_data.operand.j.imm_sext
+        fetch_data = decode_data.fetch_data
+        pc = fetch_data.pc
         return ExStage.Result(
-            decode_data=decode_data.fetch_data,
-            action_bits=AfterExAction.BRANCH | AfterExAction.WRITEBACK,
+            decode_data=fetch_data,
+            action_bits=AFTER_EX_BRANCH_WRITEBACK,
             writeback_idx=decode_data.operand.j.rd,
-            writeback_data=decode_data.fetch_data.pc + SysAddr.NUM_WORD_BYTES,
-            branch_addr=decode_data.fetch_data.pc + imm,
+            writeback_data=(pc + NUM_WORD_BYTES) & MASK32,
+            branch_addr=(pc + decode_data.imm) & MASK32,
             branch_cond=True,
         ), None
 
@@ -1031,17 +1218,14 @@ class ExStage:
         cls, decode_data: IdStage.Result, reg_file: RegFile
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
         # JALR: rd = pc + 4, pc = rs1 + imm
-        src_regs, regs_ex = reg_file.read_srcregs(
-            rs1_idx=decode_data.operand.i.rs1, rs2_idx=0
-        )
-        if regs_ex is not None:
-            return None, regs_ex
+        operand = decode_data.operand.i
+        rs1 = reg_file.regs[operand.rs1]
         return ExStage.Result(
             decode_data=decode_data.fetch_data,
-            action_bits=AfterExAction.BRANCH | AfterExAction.WRITEBACK,
-            writeback_idx=decode_data.operand.i.rd,
-            writeback_data=decode_data.fetch_data.pc + SysAddr.NUM_WORD_BYTES,
-            branch_addr=src_regs.rs1 + decode_data.operand.i.imm_sext,
+            action_bits=AFTER_EX_BRANCH_WRITEBACK,
+            writeback_idx=operand.rd,
+            writeback_data=(decode_data.fetch_data.pc + NUM_WORD_BYTES) & MASK32,
+            branch_addr=((rs1 + decode_data.imm) & ~1) & MASK32,
             branch_cond=True,
         ), None
 
@@ -1055,38 +1239,195 @@ class ExStage:
         # - Swap/Atomic XXX のために、MEM stageで読み出した値をWB stageまでに変更する必要がある
         return None, ExceptionCode.ILLEGAL_INST
 
+    # EX/MEM/WBをまとめて実行し、次のPCを返す
+    # MEM stageを使わない命令のみ対応。Result objectを作らないので命令実行の大半はこちらを通る
+
+    @classmethod
+    def _fused_nop(
+        cls, decode_data: IdStage.Result, reg_file: RegFile
+    ) -> SysAddr.AddrU32:
+        # 結果をx0に捨てるだけの命令は演算せずPCだけ進める
+        return (decode_data.fetch_data.pc + NUM_WORD_BYTES) & MASK32
+
+    @classmethod
+    def _fused_r_arithmetic(
+        cls, decode_data: IdStage.Result, reg_file: RegFile
+    ) -> SysAddr.AddrU32:
+        operand = decode_data.operand.r
+        regs = reg_file.regs
+        compute_result = R_ARITHMETIC_FUNCS[decode_data.inst_type]
+        assert compute_result is not None
+        reg_file.write(
+            addr=operand.rd, data=compute_result(regs[operand.rs1], regs[operand.rs2])
+        )
+        return (decode_data.fetch_data.pc + NUM_WORD_BYTES) & MASK32
+
+    @classmethod
+    def _fused_i_arithmetic(
+        cls, decode_data: IdStage.Result, reg_file: RegFile
+    ) -> SysAddr.AddrU32:
+        operand = decode_data.operand.i
+        compute_result = I_ARITHMETIC_FUNCS[decode_data.inst_type]
+        assert compute_result is not None
+        reg_file.write(
+            addr=operand.rd,
+            data=compute_result(reg_file.regs[operand.rs1], decode_data),
+        )
+        return (decode_data.fetch_data.pc + NUM_WORD_BYTES) & MASK32
+
+    @classmethod
+    def _fused_b_branch(
+        cls, decode_data: IdStage.Result, reg_file: RegFile
+    ) -> SysAddr.AddrU32:
+        operand = decode_data.operand
+        regs = reg_file.regs
+        branch_cond = B_BRANCH_CONDS[decode_data.inst_type]
+        assert branch_cond is not None
+        if branch_cond(regs[operand.b.rs1], regs[operand.b.rs2]):
+            return (decode_data.fetch_data.pc + decode_data.imm) & MASK32
+        return (decode_data.fetch_data.pc + NUM_WORD_BYTES) & MASK32
+
+    @classmethod
+    def _fused_u_lui(
+        cls, decode_data: IdStage.Result, reg_file: RegFile
+    ) -> SysAddr.AddrU32:
+        operand = decode_data.operand.u
+        reg_file.write(addr=operand.rd, data=decode_data.imm)
+        return (decode_data.fetch_data.pc + NUM_WORD_BYTES) & MASK32
+
+    @classmethod
+    def _fused_u_auipc(
+        cls, decode_data: IdStage.Result, reg_file: RegFile
+    ) -> SysAddr.AddrU32:
+        operand = decode_data.operand.u
+        reg_file.write(
+            addr=operand.rd,
+            data=(decode_data.fetch_data.pc + decode_data.imm) & MASK32,
+        )
+        return (decode_data.fetch_data.pc + NUM_WORD_BYTES) & MASK32
+
+    @classmethod
+    def _fused_j_jal(
+        cls, decode_data: IdStage.Result, reg_file: RegFile
+    ) -> SysAddr.AddrU32:
+        pc = decode_data.fetch_data.pc
+        reg_file.write(
+            addr=decode_data.operand.j.rd, data=(pc + NUM_WORD_BYTES) & MASK32
+        )
+        return (pc + decode_data.imm) & MASK32
+
+    @classmethod
+    def _fused_i_jalr(
+        cls, decode_data: IdStage.Result, reg_file: RegFile
+    ) -> SysAddr.AddrU32:
+        operand = decode_data.operand.i
+        # rdとrs1が同じ場合があるので、書き戻し前にrs1を読む
+        rs1 = reg_file.regs[operand.rs1]
+        pc = decode_data.fetch_data.pc
+        reg_file.write(addr=operand.rd, data=(pc + NUM_WORD_BYTES) & MASK32)
+        return ((rs1 + decode_data.imm) & ~1) & MASK32
+
+    # 命令フォーマットごとのEX/MEM/WB一括実行関数
+    FusedFunc = Callable[[IdStage.Result, RegFile], SysAddr.AddrU32]
+
+    @classmethod
+    def resolve_fused(
+        cls, decode_data: IdStage.Result
+    ) -> Optional["ExStage.FusedFunc"]:
+        """
+        Decode済の命令に対応するEX/MEM/WB一括実行関数を返す
+        MEM stageを使う命令(Load/Store等)は対応しないのでNoneを返す
+        """
+        # rd=x0で副作用もない命令は実行しても何も変わらないので、decode時点で省略する
+        if (
+            decode_data.inst_fmt in SIDE_EFFECT_FREE_INST_FMTS
+            and decode_data.operand.r.rd == 0
+        ):
+            return cls._fused_nop
+        return EX_FUSED_FUNCS[decode_data.inst_fmt.value]
+
+    # 命令フォーマットごとの実行関数
+    ExecFunc = Callable[
+        [IdStage.Result, RegFile],
+        Tuple[Optional["ExStage.Result"], ExceptionCode | None],
+    ]
+
+    @classmethod
+    def resolve(cls, inst_fmt: InstGroup) -> Optional["ExStage.ExecFunc"]:
+        """
+        命令フォーマットに対応する実行関数を返す
+        Decode済の命令と一緒に保持しておけば、再実行時にdispatchを省略できる
+        """
+        return EX_EXEC_FUNCS[inst_fmt.value]
+
     @classmethod
     def run(
         cls,
         decode_data: IdStage.Result,
         reg_file: RegFile,
     ) -> Tuple[Optional["ExStage.Result"], ExceptionCode | None]:
-        table: Dict[
-            InstGroup, Callable[[IdStage.Result, RegFile], ExceptionCode | None]
-        ] = {
-            InstGroup.NOP: cls._run_r_arithmetic,  # ADDI 0,0,0
-            InstGroup.R_ARITHMETIC_LOGICAL_MULTIPLY: cls._run_r_arithmetic,
-            InstGroup.I_ARITHMETIC_LOGICAL: cls._run_i_arithmetic,
-            InstGroup.S_STORE: cls._run_s_store,
-            InstGroup.B_BRANCH: cls._run_b_branch,
-            InstGroup.U_LUI: cls._run_u_lui,
-            InstGroup.U_AUIPC: cls._run_u_auipc,
-            InstGroup.J_JAL: cls._run_j_jal,
-            InstGroup.J_JALR: cls._run_i_jalr,
-            InstGroup.R_ATOMIC: cls._run_r_atomic,
-            # InstFmt.I_ENV: cls._run_itype,
-        }
-        execution_function = table.get(decode_data.inst_fmt, None)
+        execution_function = cls.resolve(decode_data.inst_fmt)
         # 未定義命令
         if execution_function is None:
-            logging.warning(f"Unknown instruction format: {decode_data.inst_fmt=}")
+            logging.warning(
+                "Unknown instruction format: decode_data.inst_fmt=%r",
+                decode_data.inst_fmt,
+            )
             return None, ExceptionCode.ILLEGAL_INST
         # 命令実行
         return execution_function(decode_data, reg_file)
 
 
+# rdへの書き込み以外に副作用のない命令フォーマット
+# (RV32Mの除算もゼロ除算で例外にはならないので含めてよい)
+SIDE_EFFECT_FREE_INST_FMTS: Tuple[InstGroup, ...] = (
+    InstGroup.NOP,
+    InstGroup.R_ARITHMETIC_LOGICAL_MULTIPLY,
+    InstGroup.I_ARITHMETIC_LOGICAL,
+    InstGroup.U_LUI,
+    InstGroup.U_AUIPC,
+)
+
+# 命令フォーマット -> EX/MEM/WB一括実行関数
+_EX_FUSED_FUNCS: Dict[InstGroup, ExStage.FusedFunc] = {
+    InstGroup.NOP: ExStage._fused_r_arithmetic,  # ADDI 0,0,0
+    InstGroup.R_ARITHMETIC_LOGICAL_MULTIPLY: ExStage._fused_r_arithmetic,
+    InstGroup.I_ARITHMETIC_LOGICAL: ExStage._fused_i_arithmetic,
+    InstGroup.B_BRANCH: ExStage._fused_b_branch,
+    InstGroup.U_LUI: ExStage._fused_u_lui,
+    InstGroup.U_AUIPC: ExStage._fused_u_auipc,
+    InstGroup.J_JAL: ExStage._fused_j_jal,
+    InstGroup.J_JALR: ExStage._fused_i_jalr,
+}
+# dispatchでhashを計算しないように、opcode(=InstGroup.value)で引けるtupleに展開しておく
+_EX_FUSED_FUNCS_BY_OPCODE = {fmt.value: func for fmt, func in _EX_FUSED_FUNCS.items()}
+EX_FUSED_FUNCS: Tuple[Optional[ExStage.FusedFunc], ...] = tuple(
+    _EX_FUSED_FUNCS_BY_OPCODE.get(opcode) for opcode in range(0x80)
+)
+
+# 命令フォーマット -> EX stage実行関数
+_EX_EXEC_FUNCS: Dict[InstGroup, ExStage.ExecFunc] = {
+    InstGroup.NOP: ExStage._run_r_arithmetic,  # ADDI 0,0,0
+    InstGroup.R_ARITHMETIC_LOGICAL_MULTIPLY: ExStage._run_r_arithmetic,
+    InstGroup.I_ARITHMETIC_LOGICAL: ExStage._run_i_arithmetic,
+    InstGroup.I_LOAD: ExStage._run_i_load,
+    InstGroup.S_STORE: ExStage._run_s_store,
+    InstGroup.B_BRANCH: ExStage._run_b_branch,
+    InstGroup.U_LUI: ExStage._run_u_lui,
+    InstGroup.U_AUIPC: ExStage._run_u_auipc,
+    InstGroup.J_JAL: ExStage._run_j_jal,
+    InstGroup.J_JALR: ExStage._run_i_jalr,
+    InstGroup.R_ATOMIC: ExStage._run_r_atomic,
+    # InstFmt.I_ENV: ExStage._run_itype,
+}
+_EX_EXEC_FUNCS_BY_OPCODE = {fmt.value: func for fmt, func in _EX_EXEC_FUNCS.items()}
+EX_EXEC_FUNCS: Tuple[Optional[ExStage.ExecFunc], ...] = tuple(
+    _EX_EXEC_FUNCS_BY_OPCODE.get(opcode) for opcode in range(0x80)
+)
+
+
 class MemStage:
-    @dataclass
+    @dataclass(slots=True)
     class Result:
         # ex result
         exec_data: ExStage.Result
@@ -1116,19 +1457,23 @@ class MemStage:
             assert exec_data.mem_addr is not None
             assert exec_data.mem_size is not None
             data, ex = slave.read(
-                exec_data=exec_data,
                 addr=exec_data.mem_addr,
                 access_type=AccessType.NORMAL,
                 num_en_bytes=exec_data.mem_size,
             )
             if ex is not None:
                 logging.warning(
-                    f"Failed to read memory: addr={exec_data.mem_addr:#08x}, size={exec_data.mem_size}, ex={ex}"
+                    "Failed to read memory: addr=%#08x, size=%s, ex=%s",
+                    exec_data.mem_addr,
+                    exec_data.mem_size,
+                    ex,
                 )
                 return None, ex
+            # LB/LHは符号拡張してuint32に戻す
+            sign_bit = exec_data.load_sign_bit
             return MemStage.Result(
                 exec_data=exec_data,
-                load_data=data,
+                load_data=((data ^ sign_bit) - sign_bit) & MASK32,
             ), None
         elif exec_data.action_bits & AfterExAction.STORE:
             # Store命令
@@ -1143,7 +1488,11 @@ class MemStage:
             )
             if ex is not None:
                 logging.warning(
-                    f"Failed to write memory: addr={exec_data.mem_addr:#08x}, size={exec_data.mem_size}, data={exec_data.mem_data:#08x}, ex={ex}"
+                    "Failed to write memory: addr=%#08x, size=%s, data=%#08x, ex=%s",
+                    exec_data.mem_addr,
+                    exec_data.mem_size,
+                    exec_data.mem_data,
+                    ex,
                 )
                 return None, ex
             return MemStage.Result(
@@ -1159,7 +1508,7 @@ class WbStage:
     WriteBack
     """
 
-    @dataclass
+    @dataclass(slots=True)
     class Result:
         # mem result
         mem_data: MemStage.Result
@@ -1196,7 +1545,10 @@ class WbStage:
         )
         if mem_data.exec_data.action_bits & AfterExAction.WRITEBACK:
             logging.debug(
-                f"WriteBack: {mem_data.exec_data.writeback_idx=}, {mem_data.exec_data.writeback_data=}, {mem_data.load_data=}"
+                "WriteBack: writeback_idx=%r, writeback_data=%r, load_data=%r",
+                mem_data.exec_data.writeback_idx,
+                mem_data.exec_data.writeback_data,
+                mem_data.load_data,
             )
             # WriteBack命令
             assert mem_data.exec_data.writeback_idx is not None
@@ -1205,15 +1557,10 @@ class WbStage:
             wb_data = (
                 mem_data.load_data if is_load else mem_data.exec_data.writeback_data
             )
-            ex = reg_file.write(
+            reg_file.write(
                 addr=mem_data.exec_data.writeback_idx,
                 data=wb_data,
             )
-            if ex is not None:
-                logging.warning(
-                    f"Failed to write register: addr={mem_data.exec_data.writeback_idx}, data={mem_data.load_data:#08x}, ex={ex}"
-                )
-                return ret, ex
             ret.wb_idx = mem_data.exec_data.writeback_idx
             ret.wb_data = wb_data
             ret.old_pc = pc.value
@@ -1221,7 +1568,9 @@ class WbStage:
             assert mem_data.exec_data.branch_addr is not None
             assert mem_data.exec_data.branch_cond is not None
             logging.debug(
-                f"Branch: {mem_data.exec_data.branch_addr=}, {mem_data.exec_data.branch_cond=}"
+                "Branch: branch_addr=%r, branch_cond=%r",
+                mem_data.exec_data.branch_addr,
+                mem_data.exec_data.branch_cond,
             )
             if mem_data.exec_data.branch_cond:
                 # update pc
@@ -1238,62 +1587,421 @@ class WbStage:
         return ret, None
 
 
-@dataclass
+class BlockCompiler:
+    """
+    basic blockを1つのPython関数に変換する (runtime codegen)
+    register番号/即値/PCをdecode済の値から定数として埋め込むので、
+    生成した関数はdecode結果を参照せず、block内の命令を1回の呼び出しで実行できる
+    """
+
+    # 実行関数: RegFileを受け取り、次のPCを返す
+    BlockFunc = Callable[[RegFile], SysAddr.AddrU32]
+
+    # rd <- 式 で書ける命令。{rs1}, {rs2}, {imm}, {imm_u32}, {shamt}を埋め込む
+    # 結果が32bitに収まらない可能性がある式だけmaskする
+    WRITEBACK_EXPRS: ClassVar[Dict[InstType, str]] = {
+        InstType.ADD: "(regs[{rs1}] + regs[{rs2}]) & 0xFFFFFFFF",
+        InstType.SUB: "(regs[{rs1}] - regs[{rs2}]) & 0xFFFFFFFF",
+        InstType.XOR: "regs[{rs1}] ^ regs[{rs2}]",
+        InstType.OR: "regs[{rs1}] | regs[{rs2}]",
+        InstType.AND: "regs[{rs1}] & regs[{rs2}]",
+        InstType.SLL: "(regs[{rs1}] << (regs[{rs2}] & 0x1F)) & 0xFFFFFFFF",
+        InstType.SRL: "regs[{rs1}] >> (regs[{rs2}] & 0x1F)",
+        InstType.SRA: (
+            "(((regs[{rs1}] ^ 0x80000000) - 0x80000000)"
+            " >> (regs[{rs2}] & 0x1F)) & 0xFFFFFFFF"
+        ),
+        InstType.SLT: "int((regs[{rs1}] ^ 0x80000000) < (regs[{rs2}] ^ 0x80000000))",
+        InstType.SLTU: "int(regs[{rs1}] < regs[{rs2}])",
+        InstType.ADDI: "(regs[{rs1}] + {imm}) & 0xFFFFFFFF",
+        InstType.XORI: "(regs[{rs1}] ^ {imm}) & 0xFFFFFFFF",
+        InstType.ORI: "(regs[{rs1}] | {imm}) & 0xFFFFFFFF",
+        InstType.ANDI: "regs[{rs1}] & {imm}",
+        InstType.SLLI: "(regs[{rs1}] << {shamt}) & 0xFFFFFFFF",
+        InstType.SRLI: "regs[{rs1}] >> {shamt}",
+        InstType.SRAI: (
+            "(((regs[{rs1}] ^ 0x80000000) - 0x80000000) >> {shamt}) & 0xFFFFFFFF"
+        ),
+        InstType.SLTI: "int(((regs[{rs1}] ^ 0x80000000) - 0x80000000) < {imm})",
+        InstType.SLTIU: "int(regs[{rs1}] < {imm_u32})",
+        InstType.LUI: "{imm_u32}",
+    }
+
+    # 分岐条件の式。{rs1}, {rs2}を埋め込む
+    BRANCH_EXPRS: ClassVar[Dict[InstType, str]] = {
+        InstType.BEQ: "regs[{rs1}] == regs[{rs2}]",
+        InstType.BNE: "regs[{rs1}] != regs[{rs2}]",
+        InstType.BLT: "(regs[{rs1}] ^ 0x80000000) < (regs[{rs2}] ^ 0x80000000)",
+        InstType.BGE: "(regs[{rs1}] ^ 0x80000000) >= (regs[{rs2}] ^ 0x80000000)",
+        InstType.BLTU: "regs[{rs1}] < regs[{rs2}]",
+        InstType.BGEU: "regs[{rs1}] >= regs[{rs2}]",
+    }
+
+    @classmethod
+    def emit(
+        cls,
+        idx: int,
+        fused_func: ExStage.FusedFunc,
+        decode_data: IdStage.Result,
+        namespace: Dict[str, Any],
+    ) -> List[str]:
+        """
+        1命令分のsourceを返す。分岐/jumpの場合は次のPCをreturnする行を含む
+        式にできない命令は、fused関数とdecode結果をnamespaceに置いて呼び出す
+        """
+        pc = decode_data.fetch_data.pc
+        next_pc = (pc + NUM_WORD_BYTES) & MASK32
+        inst_type = decode_data.inst_type
+        operand = decode_data.operand
+        # rd=x0で副作用のない命令は何もしない
+        if fused_func == ExStage._fused_nop:
+            return []
+        expr = cls.WRITEBACK_EXPRS.get(inst_type)
+        if expr is not None:
+            # R/I/Uのrdはすべて同じbit位置
+            return [
+                f"regs[{operand.r.rd}] = "
+                + expr.format(
+                    rs1=operand.r.rs1,
+                    rs2=operand.r.rs2,
+                    imm=decode_data.imm,
+                    imm_u32=decode_data.imm & MASK32,
+                    shamt=decode_data.shamt,
+                )
+            ]
+        if inst_type == InstType.AUIPC:
+            return [f"regs[{operand.u.rd}] = {(pc + decode_data.imm) & MASK32}"]
+        expr = cls.BRANCH_EXPRS.get(inst_type)
+        if expr is not None:
+            cond = expr.format(rs1=operand.b.rs1, rs2=operand.b.rs2)
+            return [
+                f"if {cond}:",
+                f"    return {(pc + decode_data.imm) & MASK32}",
+                f"return {next_pc}",
+            ]
+        if inst_type == InstType.JAL:
+            dst = [] if operand.j.rd == 0 else [f"regs[{operand.j.rd}] = {next_pc}"]
+            return dst + [f"return {(pc + decode_data.imm) & MASK32}"]
+        if inst_type == InstType.JALR:
+            # rdとrs1が同じ場合があるので、書き戻し前にrs1を読む
+            dst = [f"target = (regs[{operand.i.rs1}] + {decode_data.imm}) & 0xFFFFFFFE"]
+            if operand.i.rd != 0:
+                dst.append(f"regs[{operand.i.rd}] = {next_pc}")
+            return dst + ["return target"]
+        # MUL/DIV等はfused関数をそのまま呼ぶ (blockの途中なら戻り値は次の命令のPC)
+        namespace[f"fused_func{idx}"] = fused_func
+        namespace[f"decode_data{idx}"] = decode_data
+        return [f"fused_func{idx}(decode_data{idx}, reg_file)"]
+
+    @classmethod
+    def compile(
+        cls,
+        start_addr: SysAddr.AddrU32,
+        block: Tuple[Tuple[ExStage.FusedFunc, IdStage.Result], ...],
+    ) -> "BlockCompiler.BlockFunc":
+        """
+        blockを実行する関数を生成する
+        """
+        namespace: Dict[str, Any] = {}
+        lines = ["def run_block(reg_file):", "    regs = reg_file.regs"]
+        for idx, (fused_func, decode_data) in enumerate(block):
+            lines.extend(
+                f"    {line}"
+                for line in cls.emit(idx, fused_func, decode_data, namespace)
+            )
+        # 分岐/jumpで終わらないblockは次の命令へ進む
+        if not lines[-1].startswith("    return"):
+            next_addr = (start_addr + len(block) * NUM_WORD_BYTES) & MASK32
+            lines.append(f"    return {next_addr}")
+        source = "\n".join(lines)
+        logging.debug("Compile block: start_addr=%#010x\n%s", start_addr, source)
+        exec(compile(source, f"<block {start_addr:#010x}>", "exec"), namespace)
+        return namespace["run_block"]
+
+
+@dataclass(slots=True)
 class CoreConfig:
     # 初期化時点でのPC
     init_pc: int
+    # M拡張(乗除算)を有効にする
+    enable_m: bool = True
 
 
 class Core:
+    # 命令キャッシュのエントリ数 (2の累乗)
+    NUM_ICACHE_ENTRIES = 4096
+    # 1 basic blockに含める最大命令数
+    NUM_BLOCK_INSTS = 64
+    # block cacheの無効化を管理するpageのサイズ (bit数)
+    CODE_PAGE_SHIFT = 12
+    # basic blockを終端する命令フォーマット (分岐/jump)
+    BLOCK_END_INST_FMTS = (InstGroup.B_BRANCH, InstGroup.J_JAL, InstGroup.J_JALR)
+
+    # この回数実行されたblockはBlockCompilerで1つの関数に変換する
+    HOT_BLOCK_THRESHOLD = 16
+
+    # basic block: EX/MEM/WB一括実行関数とDecode済命令の組を先頭から順に並べたもの
+    Block = Tuple[Tuple[ExStage.FusedFunc, IdStage.Result], ...]
+    # block cacheのエントリ: (命令数, blockの実行関数)。空のblockは実行関数なし
+    CachedBlock = Tuple[int, Optional[BlockCompiler.BlockFunc]]
+
     def __init__(self, config: CoreConfig, slave: BusSlave):
         self.slave = slave
         # 設定参照用にstore
         self.config = config
         # RegisterFile & PC & cycles
         self.regs = RegFile()
-        self.pc = ProgramCounter(SysAddr.AddrU32(config.init_pc))
+        self.pc = ProgramCounter(config.init_pc)
         self.cycles = 0
+        # 命令フェッチ用buffer
+        self.inst_buf = InstBuffer()
+        # 無効な拡張の命令。decode cacheは全Coreで共有なので、icache登録時に弾く
+        self.disabled_inst_types: FrozenSet[InstType] = (
+            frozenset() if config.enable_m else M_EXTENSION_INST_TYPES
+        )
+        # 命令キャッシュ: PCをtagにしてDecode済の命令と実行関数を保持し、
+        # hit時はIF/IDとEXのdispatchを省略する
+        self.icache: List[
+            Tuple[
+                SysAddr.AddrU32,
+                IdStage.Result,
+                ExStage.ExecFunc,
+                Optional[ExStage.FusedFunc],
+            ]
+            | None
+        ] = [None] * self.NUM_ICACHE_ENTRIES
+        # block cache: basic blockの先頭PCをkeyにして、blockの実行関数を保持する
+        # 一括実行できない命令から始まる場合は空のblockを置いて再構築を省略する
+        self.block_cache: Dict[SysAddr.AddrU32, Core.CachedBlock] = {}
+        # page番号 -> そのpageにかかるblockの先頭PC
+        # block登録時に追加するので、書き込み時はそのpageのblockだけを破棄すればよい
+        # (命令を置いたpageだけがkeyになるので、アドレス空間全体分の領域は持たない)
+        self.code_pages: Dict[int, Set[SysAddr.AddrU32]] = {}
         self.reset()
 
     def reset(self) -> None:
         self.regs.clear()
-        self.pc = ProgramCounter(SysAddr.AddrU32(self.config.init_pc))
+        self.pc = ProgramCounter(self.config.init_pc)
         self.cycles = 0
+        self.inst_buf.clear()
+        self.icache[:] = [None] * self.NUM_ICACHE_ENTRIES
+        self.block_cache.clear()
+        self.code_pages.clear()
+
+    @classmethod
+    def icache_index(cls, addr: SysAddr.AddrU32) -> int:
+        """
+        命令キャッシュのindexを求める
+        下位8bitとpage番号(addr[:12])を混ぜることで、
+        ループ内の命令と別pageにある呼び出し先(memcpy等)を同時に保持しやすくする
+        """
+        return ((addr & 0xFF) | (addr >> 12 << 8)) & (cls.NUM_ICACHE_ENTRIES - 1)
+
+    def invalidate_icache(self, addr: SysAddr.AddrU32) -> None:
+        """
+        指定アドレスを含む命令のキャッシュを破棄する (自己書き換えコード向け)
+        """
+        inst_addr = addr & ~(NUM_WORD_BYTES - 1)
+        idx = self.icache_index(inst_addr)
+        entry = self.icache[idx]
+        if entry is not None and entry[0] == inst_addr:
+            self.icache[idx] = None
+        # block cacheに登録済のpageであれば、そのpageにかかるblockを破棄する
+        page = inst_addr >> self.CODE_PAGE_SHIFT
+        if page in self.code_pages:
+            self.invalidate_code_page(page)
+
+    def block_pages(self, start_addr: SysAddr.AddrU32, num_insts: int) -> range:
+        """
+        blockが含む命令のpage番号の範囲を返す
+        空のblockも先頭の命令が書き換えられたら作り直すので、先頭1命令分を含める
+        """
+        end_addr = start_addr + max(num_insts, 1) * NUM_WORD_BYTES
+        return range(
+            start_addr >> self.CODE_PAGE_SHIFT,
+            ((end_addr - 1) >> self.CODE_PAGE_SHIFT) + 1,
+        )
+
+    def invalidate_code_page(self, page: int) -> None:
+        """
+        指定pageにかかるblockをblock cacheから破棄する
+        pageを跨ぐblockは他方のpageにも先頭PCが残るが、次に破棄する際に余分に消えるだけで問題ない
+        """
+        for start_addr in self.code_pages.pop(page, ()):
+            self.block_cache.pop(start_addr, None)
+
+    def lookup_icache(
+        self, pc_value: SysAddr.AddrU32
+    ) -> Optional[
+        Tuple[
+            SysAddr.AddrU32,
+            IdStage.Result,
+            ExStage.ExecFunc,
+            Optional[ExStage.FusedFunc],
+        ]
+    ]:
+        """
+        pc_valueの命令キャッシュエントリを返す。missした場合はIF/IDを実行して登録する
+        Fetch/Decodeできない命令はNoneを返す (例外処理はstep側で行う)
+        """
+        icache_idx = self.icache_index(pc_value)
+        icache_entry = self.icache[icache_idx]
+        if icache_entry is not None and icache_entry[0] == pc_value:
+            return icache_entry
+        if_data, if_ex = IfStage.run(
+            pc=ProgramCounter(pc_value), slave=self.slave, inst_buf=self.inst_buf
+        )
+        if if_ex is not None or if_data is None:
+            return None
+        id_data, id_ex = IdStage.run(fetch_data=if_data)
+        if id_ex is not None or id_data is None:
+            return None
+        if id_data.inst_type in self.disabled_inst_types:
+            return None
+        ex_func = ExStage.resolve(id_data.inst_fmt)
+        if ex_func is None:
+            return None
+        icache_entry = (
+            pc_value,
+            id_data,
+            ex_func,
+            ExStage.resolve_fused(id_data),
+        )
+        self.icache[icache_idx] = icache_entry
+        return icache_entry
+
+    def decode_block(self, pc_value: SysAddr.AddrU32) -> "Core.Block":
+        """
+        pc_valueから始まるbasic blockを組み立てる
+        分岐/jump命令まで、またはEX/MEM/WBを一括実行できない命令の手前までを1blockとする
+        """
+        block: List[Tuple[ExStage.FusedFunc, IdStage.Result]] = []
+        inst_addr = pc_value
+        while len(block) < self.NUM_BLOCK_INSTS:
+            icache_entry = self.lookup_icache(inst_addr)
+            if icache_entry is None or icache_entry[3] is None:
+                break
+            _, id_data, _, fused_func = icache_entry
+            block.append((fused_func, id_data))
+            inst_addr += NUM_WORD_BYTES
+            if id_data.inst_fmt in self.BLOCK_END_INST_FMTS:
+                break
+        return tuple(block)
+
+    def make_block_runner(
+        self, start_addr: SysAddr.AddrU32, block: "Core.Block"
+    ) -> BlockCompiler.BlockFunc:
+        """
+        blockの命令を順に実行する関数を返す
+        HOT_BLOCK_THRESHOLD回実行したら、BlockCompilerで変換した関数にblock cacheを差し替える
+        """
+        num_runs = 0
+
+        def run_block(reg_file: RegFile) -> SysAddr.AddrU32:
+            nonlocal num_runs
+            num_runs += 1
+            if num_runs == self.HOT_BLOCK_THRESHOLD:
+                self.block_cache[start_addr] = (
+                    len(block),
+                    BlockCompiler.compile(start_addr, block),
+                )
+            next_pc = start_addr
+            for fused_func, id_data in block:
+                next_pc = fused_func(id_data, reg_file)
+            return next_pc
+
+        return run_block
+
+    def build_block(self, pc_value: SysAddr.AddrU32) -> "Core.CachedBlock":
+        """
+        pc_valueから始まるbasic blockを組み立ててblock cacheに登録する
+        """
+        block = self.decode_block(pc_value)
+        dst = self.block_cache[pc_value] = (
+            len(block),
+            self.make_block_runner(pc_value, block) if block else None,
+        )
+        for page in self.block_pages(pc_value, len(block)):
+            self.code_pages.setdefault(page, set()).add(pc_value)
+        return dst
 
     def step(self) -> None:
         """
         Execute one cycle
         非pipeline single cycle processor想定
         """
-        logging.debug(
-            "###################################################################################################################################"
-        )
-        logging.debug(f"[{self.cycles}]PC: {self.pc.value:#08x}")
-        logging.debug(
-            " ".join(f"R{idx:02}: {hex(reg)}" for idx, reg in enumerate(self.regs.regs))
-        )
+        # 毎回参照するattributeはlocalに置いておく
+        pc = self.pc
+        pc_value = pc.value
+        regs = self.regs
+        # stageごとの結果をlogに出す場合は、常に各stageを順に実行する
+        is_debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        if is_debug:
+            logging.debug(
+                "###################################################################################################################################"
+            )
+            logging.debug(f"[{self.cycles}]PC: {pc_value:#08x}")
+            logging.debug(
+                " ".join(f"R{idx:02}: {hex(reg)}" for idx, reg in enumerate(regs.regs))
+            )
 
-        # IF: Instruction Fetch
-        if_data, if_ex = IfStage.run(pc=self.pc, slave=self.slave)
-        logging.debug(f"[{self.cycles}]{if_data}")
-        if if_ex is not None:
-            logging.warning(f"Fetch Error: {if_ex=}")
-            raise RuntimeError(f"TODO: impl Exception Handler: {if_ex=}")
-        assert if_data is not None
+        icache = self.icache
+        icache_idx = self.icache_index(pc_value)
+        icache_entry = icache[icache_idx]
+        if icache_entry is not None and icache_entry[0] == pc_value:
+            # 命令キャッシュhit: IF/IDを省略
+            _, id_data, ex_func, fused_func = icache_entry
+            if fused_func is not None and not is_debug:
+                # EX/MEM/WBを一括実行
+                pc.value = fused_func(id_data, regs)
+                self.cycles += 1
+                return
+            if is_debug:
+                logging.debug(f"[{self.cycles}]{id_data}")
+        else:
+            # IF: Instruction Fetch
+            if_data, if_ex = IfStage.run(
+                pc=pc, slave=self.slave, inst_buf=self.inst_buf
+            )
+            if is_debug:
+                logging.debug(f"[{self.cycles}]{if_data}")
+            if if_ex is not None:
+                logging.warning("Fetch Error: if_ex=%r", if_ex)
+                raise RuntimeError(f"TODO: impl Exception Handler: {if_ex=}")
+            assert if_data is not None
+
+            # ID: Instruction Decode
+            id_data, id_ex = IdStage.run(fetch_data=if_data)
+            if is_debug:
+                logging.debug(f"[{self.cycles}]{id_data}")
+            if id_ex is not None:
+                logging.warning("Decode Error: id_ex=%r", id_ex)
+                raise RuntimeError(f"TODO: impl Exception Handler: {id_ex=}")
+            assert id_data is not None
+            if id_data.inst_type in self.disabled_inst_types:
+                logging.warning(
+                    "Disabled instruction: id_data.inst_type=%r", id_data.inst_type
+                )
+                raise RuntimeError(
+                    f"TODO: impl Exception Handler: {ExceptionCode.ILLEGAL_INST}"
+                )
 
-        # ID: Instruction Decode
-        id_data, id_ex = IdStage.run(fetch_data=if_data)
-        logging.debug(f"[{self.cycles}]{id_data}")
-        if id_ex is not None:
-            logging.warning(f"Decode Error: {id_ex=}")
-            raise RuntimeError(f"TODO: impl Exception Handler: {id_ex=}")
-        assert id_data is not None
+            # 実行関数の解決
+            ex_func = ExStage.resolve(id_data.inst_fmt)
+            if ex_func is None:
+                logging.warning("Execute Error: id_data.inst_fmt=%r", id_data.inst_fmt)
+                raise RuntimeError(
+                    f"TODO: impl Exception Handler: {ExceptionCode.ILLEGAL_INST}"
+                )
+            fused_func = ExStage.resolve_fused(id_data)
+            icache[icache_idx] = (pc_value, id_data, ex_func, fused_func)
 
         # EX: Execute
-        ex_data, ex_ex = ExStage.run(decode_data=id_data, reg_file=self.regs)
-        logging.debug(f"[{self.cycles}]{ex_data}")
+        ex_data, ex_ex = ex_func(id_data, regs)
+        if is_debug:
+            logging.debug(f"[{self.cycles}]{ex_data}")
         if ex_ex is not None:
-            logging.warning(f"Execute Error: {ex_ex=}")
+            logging.warning("Execute Error: ex_ex=%r", ex_ex)
             raise RuntimeError(f"TODO: impl Exception Handler: {ex_ex=}")
         assert ex_data is not None
 
@@ -1301,24 +2009,70 @@ class Core:
         mem_data, mem_ex = MemStage.run(
             exec_data=ex_data, slave=self.slave
         )  # TODO: 並行する場合、WB->EX forwarding必要
-        logging.debug(f"[{self.cycles}]{mem_data}")
+        if is_debug:
+            logging.debug(f"[{self.cycles}]{mem_data}")
         if mem_ex is not None:
-            logging.warning(f"Memory Access Error: {mem_ex=}")
+            logging.warning("Memory Access Error: mem_ex=%r", mem_ex)
             raise RuntimeError(f"TODO: impl Exception Handler: {mem_ex=}")
         assert mem_data is not None
+        if ex_data.action_bits & AfterExAction.STORE:
+            # 命令領域への書き込みであればキャッシュ済の命令を破棄
+            self.inst_buf.invalidate(ex_data.mem_addr)
+            self.invalidate_icache(ex_data.mem_addr)
 
         # WB: WriteBack
-        wb_data, wb_ex = WbStage.run(mem_data=mem_data, pc=self.pc, reg_file=self.regs)
-        logging.debug(f"[{self.cycles}]{wb_data}")
+        wb_data, wb_ex = WbStage.run(mem_data=mem_data, pc=pc, reg_file=regs)
+        if is_debug:
+            logging.debug(f"[{self.cycles}]{wb_data}")
         if wb_ex is not None:
-            logging.warning(f"WriteBack Error: {wb_ex=}")
+            logging.warning("WriteBack Error: wb_ex=%r", wb_ex)
             raise RuntimeError(f"TODO: impl Exception Handler: {wb_ex=}")
         assert wb_data is not None
 
         # Next PC (not branch)
         if not wb_data.jumped:
-            self.pc.value += SysAddr.NUM_WORD_BYTES  # TODO: branch
+            pc.value = (pc.value + NUM_WORD_BYTES) & MASK32
         # increment cycle
         self.cycles += 1
 
         # TODO: Exception, Interrupt, Debug, etc...
+
+    def step_n(self, num_steps: int) -> None:
+        """
+        Execute num_steps cycles
+        block cacheにあるbasic blockはこのloop内でまとめて実行し、
+        それ以外(一括実行できない命令, 残りcycle数を超えるblock, DEBUG log有効時)は
+        stepで1命令ずつ実行する
+        """
+        # loop中に変化しないattributeはlocalに置いておく
+        pc = self.pc
+        regs = self.regs
+        block_cache = self.block_cache
+        build_block = self.build_block
+        step = self.step
+        is_debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+        pc_value = pc.value
+        num_fused_cycles = 0
+        remain_steps = num_steps
+        try:
+            while remain_steps > 0:
+                num_insts, run_block = 0, None
+                if not is_debug:
+                    cached_block = block_cache.get(pc_value)
+                    if cached_block is None:
+                        cached_block = build_block(pc_value)
+                    num_insts, run_block = cached_block
+                if run_block is not None and num_insts <= remain_steps:
+                    pc_value = run_block(regs)
+                    num_fused_cycles += num_insts
+                    remain_steps -= num_insts
+                else:
+                    pc.value = pc_value
+                    step()
+                    pc_value = pc.value
+                    remain_steps -= 1
+        finally:
+            # step側で例外が出た場合もそこまでの状態は反映する
+            pc.value = pc_value
+            self.cycles += num_fused_cycles
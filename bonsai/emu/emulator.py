@@ -178,8 +178,7 @@ class Emulator:
         core = Core(config=CoreConfig(init_pc=bootinfo.entry_point_addr), slave=bus0)
         core.reset()
         # TODO: Implement the emulator
-        for _ in range(100):
-            core.step()
+        core.step_n(100)
 
     @classmethod
     def main(cls, args: argparse.Namespace) -> None:
@@ -23,6 +23,12 @@ class SysAddr:
     NUM_WORD_BITS = 32
 
 
+# 有効byte数ごとのデータmask。アクセスのたびにshiftで作らないよう先に並べておく
+BYTE_MASKS: Tuple[int, ...] = tuple(
+    (1 << (num_en_bytes * 8)) - 1 for num_en_bytes in range(SysAddr.NUM_WORD_BYTES + 1)
+)
+
+
 class AccessType(enum.Enum):
     """
     バスアクセスのキャッシュ制御種類
@@ -92,6 +98,28 @@ class BusSlave(ABC):
         """
         pass
 
+    def read_block(
+        self,
+        addr: SysAddr.AddrU32,
+        num_words: int,
+        access_type: AccessType = AccessType.NORMAL,
+    ) -> Tuple[List[SysAddr.DataU32], BusError | None]:
+        """
+        Read consecutive words from the slave
+        readに副作用があるslave (MMIO等) を先読みしないよう、defaultでは未対応を返す
+        まとめて読んでも問題ないslaveのみoverrideする
+        """
+        return [], BusError.ERROR_UNSUPPORTED
+
+    def get_word_view(
+        self, addr: SysAddr.AddrU32
+    ) -> Tuple[SysAddr.AddrU32, List[SysAddr.DataU32]] | None:
+        """
+        addrを含む領域の先頭アドレスと、word単位の生データを参照のまま返す
+        コピーしないので書き込みも反映される。生データを持たないslaveはNone
+        """
+        return None
+
     def mask_unaligned_data(
         self,
         read_data: SysAddr.DataU32,
@@ -102,7 +130,7 @@ class BusSlave(ABC):
         指定されたデータをoffset+bytemaskして返す
         """
         # データのマスク
-        byte_mask = (1 << (num_en_bytes * 8)) - 1
+        byte_mask = BYTE_MASKS[num_en_bytes]
         read_data = (read_data >> (offset * 8)) & byte_mask
         return read_data
 
@@ -117,7 +145,7 @@ class BusSlave(ABC):
         指定されたデータをoffset+bytemaskして適用したものを返す
         """
         # 有効部分だけにした書き込みデータを作成
-        byte_mask = (1 << (num_en_bytes * 8)) - 1
+        byte_mask = BYTE_MASKS[num_en_bytes]
         write_data = (write_data & byte_mask) << (offset * 8)
         # 現在のデータの書き込み部分を0にMaskしたデータを作成
         current_data = current_data & ~(byte_mask << (offset * 8))
@@ -221,6 +249,30 @@ class FixSizeRam(BusSlave):
         )
         return data, None
 
+    def read_block(
+        self,
+        addr: SysAddr.AddrU32,
+        num_words: int,
+        access_type: AccessType = AccessType.NORMAL,
+    ) -> Tuple[List[SysAddr.DataU32], BusError | None]:
+        # アドレス範囲チェック
+        end_addr = addr + num_words * SysAddr.NUM_WORD_BYTES
+        if addr < 0 or end_addr > self.size:
+            return [], BusError.ERROR_OUT_OF_RANGE
+        # word単位のみ対応
+        if addr % SysAddr.NUM_WORD_BYTES != 0:
+            return [], BusError.ERROR_MISALIGN
+        # 保持しているwordをそのままsliceで返す
+        word_addr = addr // SysAddr.NUM_WORD_BYTES
+        return self.datas[word_addr : word_addr + num_words], None
+
+    def get_word_view(
+        self, addr: SysAddr.AddrU32
+    ) -> Tuple[SysAddr.AddrU32, List[SysAddr.DataU32]] | None:
+        if addr < 0 or addr >= self.size:
+            return None
+        return 0, self.datas
+
     def write(
         self,
         addr: SysAddr.AddrU32,
@@ -420,7 +472,7 @@ class UartModule(MemMappedRegModule):
             # TX_DATA: cleared reg
             return 0, None
         else:
-            logging.warning(f"Invalid register index: {reg_idx=}")
+            logging.warning("Invalid register index: reg_idx=%r", reg_idx)
             return 0, BusError.ERROR_OUT_OF_RANGE
 
     def write_reg(
@@ -431,11 +483,11 @@ class UartModule(MemMappedRegModule):
     ) -> BusError | None:
         if reg_idx == UartModule.RegIdx.RX_VALID.value:
             # RX_VALID: read only
-            logging.warning(f"RX_VALID is read only. {reg_idx=}, {data=}")
+            logging.warning("RX_VALID is read only. reg_idx=%r, data=%r", reg_idx, data)
             return BusError.ERROR_UNSUPPORTED
         elif reg_idx == UartModule.RegIdx.RX_DATA.value:
             # RX_DATA: read only
-            logging.warning(f"RX_DATA is read only. {reg_idx=}, {data=}")
+            logging.warning("RX_DATA is read only. reg_idx=%r, data=%r", reg_idx, data)
             return BusError.ERROR_UNSUPPORTED
         elif reg_idx == UartModule.RegIdx.TX_FULL.value:
             # TX_FULL: read only
@@ -450,7 +502,7 @@ class UartModule(MemMappedRegModule):
                     f.write(char)
             return None
         else:
-            logging.warning(f"Invalid register index: {reg_idx}")
+            logging.warning("Invalid register index: %s", reg_idx)
             return BusError.ERROR_OUT_OF_RANGE
 
     @property
@@ -521,6 +573,36 @@ class BusArbiter(BusSlave):
                 )
         return 0, BusError.ERROR_OUT_OF_RANGE
 
+    def read_block(
+        self,
+        addr: SysAddr.AddrU32,
+        num_words: int,
+        access_type: AccessType = AccessType.NORMAL,
+    ) -> Tuple[List[SysAddr.DataU32], BusError | None]:
+        # 1つのslaveに収まる範囲のみ対応
+        end_addr = addr + num_words * SysAddr.NUM_WORD_BYTES - 1
+        for entry in self._entries:
+            if entry.is_in_range(addr):
+                if not entry.is_in_range(end_addr):
+                    return [], BusError.ERROR_OUT_OF_RANGE
+                return entry.slave.read_block(
+                    addr - entry.start_addr, num_words, access_type
+                )
+        return [], BusError.ERROR_OUT_OF_RANGE
+
+    def get_word_view(
+        self, addr: SysAddr.AddrU32
+    ) -> Tuple[SysAddr.AddrU32, List[SysAddr.DataU32]] | None:
+        for entry in self._entries:
+            if entry.is_in_range(addr):
+                view = entry.slave.get_word_view(addr - entry.start_addr)
+                if view is None:
+                    return None
+                # slave内のアドレスをbus上のアドレスに変換
+                base_addr, datas = view
+                return entry.start_addr + base_addr, datas
+        return None
+
     def write(
         self,
         addr: SysAddr.AddrU32,
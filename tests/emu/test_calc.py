@@ -0,0 +1,26 @@
+import pytest
+
+from bonsai.emu.calc import Calc
+
+
+@pytest.mark.parametrize(
+    "data, num_bit_width, expected",
+    [
+        (0x000, 12, 0),
+        (0x7FF, 12, 2047),
+        (0x800, 12, -2048),
+        (0xFFF, 12, -1),
+        (0x1000, 13, -4096),
+        (0x0FFE, 13, 4094),
+        (0x100000, 21, -1048576),
+        (0x0FFFFE, 21, 1048574),
+        (0x7FFFFFFF, 32, 2147483647),
+        (0x80000000, 32, -2147483648),
+        (0xFFFFFFFF, 32, -1),
+        # 上位bitは無視される
+        (0x1_0000_0001, 32, 1),
+        (-1, 32, -1),
+    ],
+)
+def test_sign_extend(data: int, num_bit_width: int, expected: int):
+    assert Calc.sign_extend(data, num_bit_width) == expected
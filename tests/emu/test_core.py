@@ -0,0 +1,780 @@
+import logging
+from typing import List
+
+import pytest
+
+from bonsai.emu.core import (
+    B_BRANCH_CONDS,
+    B_BRANCH_INST_TYPES,
+    I_ARITHMETIC_FUNCS,
+    I_ARITHMETIC_INST_TYPES,
+    I_LOAD_INST_TYPES,
+    I_LOAD_OPS,
+    I_SHIFT_INST_TYPES,
+    R_ARITHMETIC_FUNCS,
+    R_INST_TYPES,
+    S_STORE_INST_TYPES,
+    S_STORE_OPS,
+    BlockCompiler,
+    Core,
+    CoreConfig,
+    ExceptionCode,
+    ExStage,
+    IdStage,
+    IfStage,
+    InstBuffer,
+    InstType,
+    MemStage,
+    Operand,
+    ProgramCounter,
+    RegFile,
+    WbStage,
+)
+from bonsai.emu.mem import (
+    AccessType,
+    BusArbiter,
+    BusArbiterEntry,
+    BusError,
+    BusSlave,
+    FixSizeRam,
+)
+
+################################################################################
+# 命令エンコード (テスト用の最小限のアセンブラ)
+
+
+def enc_r(funct7: int, rs2: int, rs1: int, funct3: int, rd: int) -> int:
+    return (
+        (funct7 << 25) | (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | 0x33
+    )
+
+
+def enc_i(imm: int, rs1: int, funct3: int, rd: int, opcode: int = 0x13) -> int:
+    return ((imm & 0xFFF) << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | opcode
+
+
+def enc_s(imm: int, rs2: int, rs1: int, funct3: int) -> int:
+    imm &= 0xFFF
+    return (
+        ((imm >> 5) << 25)
+        | (rs2 << 20)
+        | (rs1 << 15)
+        | (funct3 << 12)
+        | ((imm & 0x1F) << 7)
+        | 0x23
+    )
+
+
+def enc_b(imm: int, rs2: int, rs1: int, funct3: int) -> int:
+    imm &= 0x1FFF
+    return (
+        (((imm >> 12) & 0x1) << 31)
+        | (((imm >> 5) & 0x3F) << 25)
+        | (rs2 << 20)
+        | (rs1 << 15)
+        | (funct3 << 12)
+        | (((imm >> 1) & 0xF) << 8)
+        | (((imm >> 11) & 0x1) << 7)
+        | 0x63
+    )
+
+
+def enc_j(imm: int, rd: int) -> int:
+    imm &= 0x1FFFFF
+    return (
+        (((imm >> 20) & 0x1) << 31)
+        | (((imm >> 1) & 0x3FF) << 21)
+        | (((imm >> 11) & 0x1) << 20)
+        | (((imm >> 12) & 0xFF) << 12)
+        | (rd << 7)
+        | 0x6F
+    )
+
+
+def enc_u(imm: int, rd: int, opcode: int) -> int:
+    return (imm & 0xFFFFF000) | (rd << 7) | opcode
+
+
+def run_program(program: List[int], num_steps: int) -> Core:
+    ram = FixSizeRam(name="ram", size=0x2000, init_data=program)
+    bus = BusArbiter(name="bus", entries=[BusArbiterEntry(slave=ram, start_addr=0)])
+    core = Core(config=CoreConfig(init_pc=0), slave=bus)
+    for _ in range(num_steps):
+        core.step()
+    return core
+
+
+################################################################################
+# Decode
+
+
+@pytest.mark.parametrize(
+    "raw, inst_type",
+    [
+        (enc_r(funct7=0b0000000, rs2=3, rs1=2, funct3=0b000, rd=1), InstType.ADD),
+        (enc_r(funct7=0b0100000, rs2=3, rs1=2, funct3=0b000, rd=1), InstType.SUB),
+        (enc_r(funct7=0b0000000, rs2=3, rs1=2, funct3=0b101, rd=1), InstType.SRL),
+        (enc_r(funct7=0b0100000, rs2=3, rs1=2, funct3=0b101, rd=1), InstType.SRA),
+        (enc_r(funct7=0b0000001, rs2=3, rs1=2, funct3=0b000, rd=1), InstType.MUL),
+        (enc_r(funct7=0b0000001, rs2=3, rs1=2, funct3=0b111, rd=1), InstType.REMU),
+        (enc_i(imm=-1, rs1=2, funct3=0b000, rd=1), InstType.ADDI),
+        (enc_i(imm=3, rs1=2, funct3=0b101, rd=1), InstType.SRLI),
+        (enc_i(imm=0x400 | 3, rs1=2, funct3=0b101, rd=1), InstType.SRAI),
+        (enc_i(imm=4, rs1=2, funct3=0b000, rd=1, opcode=0x03), InstType.LB),
+        (enc_i(imm=4, rs1=2, funct3=0b101, rd=1, opcode=0x03), InstType.LHU),
+        (enc_s(imm=4, rs2=2, rs1=1, funct3=0b010), InstType.SW),
+        (enc_b(imm=4, rs2=2, rs1=1, funct3=0b110), InstType.BLTU),
+        (enc_j(imm=4, rd=1), InstType.JAL),
+    ],
+)
+def test_decode(raw: int, inst_type: InstType):
+    id_data, id_ex = IdStage.run(IfStage.Result(pc=0, raw=raw))
+    assert id_ex is None
+    assert id_data.inst_type == inst_type
+
+
+@pytest.mark.parametrize(
+    "raw, imm",
+    [
+        (enc_i(imm=-3, rs1=2, funct3=0b000, rd=1), -3),
+        (enc_i(imm=-3, rs1=2, funct3=0b000, rd=1, opcode=0b1100111), -3),  # JALR
+        (enc_i(imm=-3, rs1=2, funct3=0b010, rd=1, opcode=0x03), -3),  # LW
+        (enc_s(imm=-4, rs2=2, rs1=1, funct3=0b010), -4),
+        (enc_b(imm=-0x1000, rs2=2, rs1=1, funct3=0b000), -0x1000),
+        (enc_u(imm=0xFFFFF000, rd=1, opcode=0b0110111), 0xFFFFF000),  # LUI
+        (enc_j(imm=-2, rd=1), -2),
+        (enc_r(funct7=0, rs2=3, rs1=2, funct3=0b000, rd=1), 0),
+    ],
+)
+def test_decode_imm(raw: int, imm: int):
+    # 即値はdecode時点で符号拡張しておく
+    id_data, id_ex = IdStage.run(IfStage.Result(pc=0, raw=raw))
+    assert id_ex is None
+    assert id_data.imm == imm
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        # funct7が未定義のR-Type
+        enc_r(funct7=0b1111111, rs2=3, rs1=2, funct3=0b000, rd=1),
+        # imm[11:5]が不正なshift
+        enc_i(imm=0x200 | 3, rs1=2, funct3=0b101, rd=1),
+        enc_i(imm=0x400 | 3, rs1=2, funct3=0b001, rd=1),
+        # RV32にないLoad (LD, LWU)
+        enc_i(imm=0, rs1=2, funct3=0b011, rd=1, opcode=0x03),
+        enc_i(imm=0, rs1=2, funct3=0b110, rd=1, opcode=0x03),
+        # 未定義のopcode
+        0x0000007F,
+    ],
+)
+def test_decode_illegal(raw: int):
+    id_data, id_ex = IdStage.run(IfStage.Result(pc=0, raw=raw))
+    assert id_data is None
+    assert id_ex == ExceptionCode.ILLEGAL_INST
+    # mcauseのException Codeとしてそのまま使える
+    assert id_ex == 2
+
+
+def test_operand_fields():
+    operand = Operand(enc_r(funct7=0b0100000, rs2=31, rs1=17, funct3=0b101, rd=9))
+    assert operand.common.opcode == 0x33
+    assert operand.r.rd == 9
+    assert operand.r.funct3 == 0b101
+    assert operand.r.rs1 == 17
+    assert operand.r.rs2 == 31
+    assert operand.r.funct7 == 0b0100000
+    operand = Operand(enc_s(imm=-4, rs2=2, rs1=1, funct3=0b010))
+    assert operand.s.imm == 0xFFC
+    assert operand.s.imm_sext == -4
+
+
+@pytest.mark.parametrize("imm", [0, 2, -2, 0x7FE, 0x800, -0x800, 0xFFE, -0x1000])
+def test_b_imm(imm: int):
+    operand = Operand(enc_b(imm=imm, rs2=3, rs1=4, funct3=0b001))
+    assert operand.b_imm == imm & 0x1FFF
+    assert operand.b_imm_sext == imm
+
+
+@pytest.mark.parametrize("imm", [0, 2, -2, 0x7FE, 0x800, 0xFF000, -0x100000])
+def test_j_imm(imm: int):
+    operand = Operand(enc_j(imm=imm, rd=1))
+    assert operand.j_imm == imm & 0x1FFFFF
+    assert operand.j_imm_sext == imm
+
+
+################################################################################
+# Execute
+
+
+def test_loop_sum():
+    program = [
+        enc_i(imm=0, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, 0
+        enc_i(imm=10, rs1=0, funct3=0b000, rd=2),  # addi x2, x0, 10
+        enc_r(funct7=0, rs2=2, rs1=1, funct3=0b000, rd=1),  # loop: add x1, x1, x2
+        enc_i(imm=-1, rs1=2, funct3=0b000, rd=2),  # addi x2, x2, -1
+        enc_b(imm=-8, rs2=0, rs1=2, funct3=0b001),  # bne x2, x0, loop
+        enc_j(imm=0, rd=0),  # jal x0, 0
+    ]
+    core = run_program(program, num_steps=2 + 3 * 10 + 5)
+    assert core.regs.regs[1] == sum(range(1, 11))
+    assert core.regs.regs[2] == 0
+    assert core.pc.value == 0x14
+
+
+def test_jal_link():
+    program = [
+        enc_j(imm=8, rd=1),  # jal x1, +8
+        enc_i(imm=1, rs1=0, funct3=0b000, rd=2),  # (skipped)
+        enc_i(imm=2, rs1=0, funct3=0b000, rd=3),  # addi x3, x0, 2
+    ]
+    core = run_program(program, num_steps=2)
+    assert core.regs.regs[1] == 4
+    assert core.regs.regs[2] == 0
+    assert core.regs.regs[3] == 2
+    assert core.pc.value == 12
+
+
+def test_self_modifying_code():
+    program = [
+        enc_i(imm=1, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, 1
+        enc_i(imm=5, rs1=0, funct3=0b000, rd=2),  # addi x2, x0, 5
+        enc_i(imm=20, rs1=2, funct3=0b001, rd=2),  # slli x2, x2, 20
+        enc_i(imm=0x93, rs1=2, funct3=0b000, rd=2),  # addi x2, x2, 0x93
+        enc_s(imm=0, rs2=2, rs1=0, funct3=0b010),  # sw x2, 0(x0)
+        enc_j(imm=-20, rd=0),  # jal x0, 0
+    ]
+    # 書き換え後の先頭命令は addi x1, x0, 5
+    assert enc_i(imm=5, rs1=0, funct3=0b000, rd=1) == 0x00500093
+    core = run_program(program, num_steps=6)
+    assert core.regs.regs[1] == 1
+    assert core.pc.value == 0
+    core.step()
+    assert core.regs.regs[1] == 5
+
+
+@pytest.mark.parametrize(
+    "funct7, funct3, rs1_data, rs2_data, expected",
+    [
+        # ADD/SUB
+        (0b0000000, 0b000, 1, -1, 0),
+        (0b0100000, 0b000, 1, 2, 0xFFFFFFFF),
+        # SLL/SRL/SRA: shift量は下位5bitのみ
+        (0b0000000, 0b001, 1, 33, 2),
+        (0b0000000, 0b101, -16, 2, 0x3FFFFFFC),
+        (0b0100000, 0b101, -16, 2, 0xFFFFFFFC),
+        # SLT/SLTU
+        (0b0000000, 0b010, -1, 1, 1),
+        (0b0000000, 0b011, -1, 1, 0),
+        # XOR/OR/AND
+        (0b0000000, 0b100, -1, 0x0F, 0xFFFFFFF0),
+        (0b0000000, 0b110, 0x30, 0x0F, 0x3F),
+        (0b0000000, 0b111, -1, 0x0F, 0x0F),
+        # MUL: 結果は32bitにmaskされる
+        (0b0000001, 0b000, -1, 2, 0xFFFFFFFE),
+        (0b0000001, 0b000, 0x7FF, 0x7FF, 0x003FF001),
+        # MULH/MULHSU/MULHU: 上位32bit (MULHSUはrs1が符号付き、rs2が符号なし)
+        (0b0000001, 0b001, -1, 2, 0xFFFFFFFF),
+        (0b0000001, 0b001, -1, -1, 0),
+        (0b0000001, 0b010, -1, 2, 0xFFFFFFFF),
+        (0b0000001, 0b010, 2, -1, 1),
+        (0b0000001, 0b011, -1, 2, 1),
+        (0b0000001, 0b011, -1, -1, 0xFFFFFFFE),
+        # DIV/DIVU/REM/REMU: 0除算は例外にならない
+        (0b0000001, 0b100, 7, 2, 3),
+        # DIV/REMは0方向に丸める (余りの符号は被除数に合わせる)
+        (0b0000001, 0b100, -7, 2, 0xFFFFFFFD),
+        (0b0000001, 0b100, 7, -2, 0xFFFFFFFD),
+        (0b0000001, 0b110, -7, 2, 0xFFFFFFFF),
+        (0b0000001, 0b110, 7, -2, 1),
+        (0b0000001, 0b110, -7, -2, 0xFFFFFFFF),
+        (0b0000001, 0b100, 7, 0, 0xFFFFFFFF),
+        (0b0000001, 0b101, -1, 0, 0xFFFFFFFF),
+        (0b0000001, 0b110, -7, 0, 0xFFFFFFF9),
+        (0b0000001, 0b111, 7, 0, 7),
+    ],
+)
+def test_r_arithmetic(
+    funct7: int, funct3: int, rs1_data: int, rs2_data: int, expected: int
+):
+    program = [
+        enc_i(imm=rs1_data, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, rs1_data
+        enc_i(imm=rs2_data, rs1=0, funct3=0b000, rd=2),  # addi x2, x0, rs2_data
+        enc_r(funct7=funct7, rs2=2, rs1=1, funct3=funct3, rd=3),
+    ]
+    core = run_program(program, num_steps=3)
+    assert core.regs.regs[3] == expected
+
+
+@pytest.mark.parametrize(
+    "funct3, rs1_data, rs2_data, taken",
+    [
+        (0b000, -1, -1, True),  # BEQ
+        (0b001, -1, -1, False),  # BNE
+        (0b100, -1, 1, True),  # BLT
+        (0b101, -1, 1, False),  # BGE
+        (0b110, -1, 1, False),  # BLTU
+        (0b111, -1, 1, True),  # BGEU
+    ],
+)
+def test_b_branch(funct3: int, rs1_data: int, rs2_data: int, taken: bool):
+    program = [
+        enc_i(imm=rs1_data, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, rs1_data
+        enc_i(imm=rs2_data, rs1=0, funct3=0b000, rd=2),  # addi x2, x0, rs2_data
+        enc_b(imm=-8, rs2=2, rs1=1, funct3=funct3),  # bxx x1, x2, -8
+    ]
+    core = run_program(program, num_steps=3)
+    assert core.pc.value == (0 if taken else 12)
+
+
+@pytest.mark.parametrize(
+    "imm, funct3, rs1_data, expected",
+    [
+        (4, 0b001, 1, 0x10),  # SLLI
+        (4, 0b101, -16, 0x0FFFFFFF),  # SRLI
+        (0x400 | 4, 0b101, -16, 0xFFFFFFFF),  # SRAI
+        # 即値は符号拡張してから演算する
+        (-1, 0b100, 0x234, 0xFFFFFDCB),  # XORI (NOT)
+        (-16, 0b110, 0x1, 0xFFFFFFF1),  # ORI
+        (-16, 0b111, 0x234, 0x230),  # ANDI
+        (-1, 0b010, -2, 1),  # SLTI
+        (-1, 0b011, 0x7FF, 1),  # SLTIU (0x7FF < 0xFFFFFFFF)
+    ],
+)
+def test_i_arithmetic(imm: int, funct3: int, rs1_data: int, expected: int):
+    program = [
+        enc_i(imm=rs1_data, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, rs1_data
+        enc_i(imm=imm, rs1=1, funct3=funct3, rd=2),
+    ]
+    core = run_program(program, num_steps=2)
+    assert core.regs.regs[2] == expected
+
+
+@pytest.mark.parametrize(
+    "decode_table, exec_table",
+    [
+        (R_INST_TYPES, R_ARITHMETIC_FUNCS),
+        (I_ARITHMETIC_INST_TYPES, I_ARITHMETIC_FUNCS),
+        (I_SHIFT_INST_TYPES, I_ARITHMETIC_FUNCS),
+        (I_LOAD_INST_TYPES, I_LOAD_OPS),
+        (S_STORE_INST_TYPES, S_STORE_OPS),
+        (B_BRANCH_INST_TYPES, B_BRANCH_CONDS),
+    ],
+)
+def test_exec_tables_cover_decode(decode_table, exec_table):
+    # Decodeできる命令はすべてEX stageの実行テーブルにも登録されている
+    for inst_type in decode_table:
+        if inst_type is not None:
+            assert exec_table[inst_type] is not None, inst_type
+
+
+def test_i_load(caplog: pytest.LogCaptureFixture):
+    program = [
+        enc_u(imm=0x80FF8000, rd=1, opcode=0b0110111),  # lui x1, 0x80ff8
+        enc_i(imm=-0xFF, rs1=1, funct3=0b000, rd=1),  # addi x1, x1, -0xff
+        enc_u(imm=0x1000, rd=2, opcode=0b0110111),  # lui x2, 0x1
+        enc_s(imm=4, rs2=1, rs1=2, funct3=0b010),  # sw x1, 4(x2)
+        enc_i(imm=4, rs1=2, funct3=0b010, rd=3, opcode=0x03),  # lw x3, 4(x2)
+        enc_i(imm=7, rs1=2, funct3=0b100, rd=4, opcode=0x03),  # lbu x4, 7(x2)
+        enc_i(imm=7, rs1=2, funct3=0b000, rd=5, opcode=0x03),  # lb x5, 7(x2)
+        enc_i(imm=6, rs1=2, funct3=0b001, rd=6, opcode=0x03),  # lh x6, 6(x2)
+        enc_i(imm=4, rs1=2, funct3=0b101, rd=7, opcode=0x03),  # lhu x7, 4(x2)
+        enc_i(imm=4, rs1=2, funct3=0b000, rd=8, opcode=0x03),  # lb x8, 4(x2)
+        enc_i(imm=4, rs1=2, funct3=0b010, rd=0, opcode=0x03),  # lw x0, 4(x2)
+    ]
+    expected = [0x80FF7F01, 0x80, 0xFFFFFF80, 0xFFFF80FF, 0x7F01, 0x01]
+    core = run_program(program, num_steps=0)
+    core.step_n(len(program))
+    assert core.regs.regs[1] == 0x80FF7F01
+    assert core.regs.regs[3:9] == expected
+    assert core.regs.regs[0] == 0
+    assert core.pc.value == len(program) * 4
+    # DEBUG logが有効な(各stageを順に実行する)場合も同じ結果になる
+    with caplog.at_level(logging.DEBUG):
+        staged_core = run_program(program, num_steps=len(program))
+    assert staged_core.regs.regs == core.regs.regs
+
+
+def test_regfile_clear():
+    core = run_program([enc_i(imm=1, rs1=0, funct3=0b000, rd=1)], num_steps=1)
+    regs = core.regs.regs
+    assert regs[1] == 1
+    core.regs.clear()
+    # 同じlistがその場で0埋めされる
+    assert core.regs.regs is regs
+    assert regs == [0] * 32
+
+
+def test_inst_buffer_fetch():
+    program = [enc_i(imm=idx, rs1=0, funct3=0b000, rd=1) for idx in range(80)]
+    core = run_program(program, num_steps=70)
+    assert core.regs.regs[1] == 69
+    # RAMの生データをそのまま参照している
+    assert core.inst_buf.is_view
+    assert core.inst_buf.base_addr == 0
+    assert core.inst_buf.datas[:80] == program
+
+
+def test_inst_buffer_block_read(mocker):
+    program = [enc_i(imm=idx, rs1=0, funct3=0b000, rd=1) for idx in range(80)]
+    # 生データを参照できないslaveではblock単位で読み出す
+    mocker.patch.object(FixSizeRam, "get_word_view", return_value=None)
+    core = run_program(program, num_steps=70)
+    assert core.regs.regs[1] == 69
+    # 2回目のrefillで64word目からのblockを保持している
+    assert not core.inst_buf.is_view
+    assert core.inst_buf.base_addr == 64 * 4
+    assert core.inst_buf.datas[:16] == program[64:]
+
+
+class CountingRom(BusSlave):
+    """
+    read回数を数えるだけの読み出し専用slave (MMIO相当)
+    """
+
+    def __init__(self, datas: List[int]):
+        self.datas = datas
+        self.read_addrs: List[int] = []
+
+    def get_name(self) -> str:
+        return "counting_rom"
+
+    def get_size(self) -> int:
+        return len(self.datas) * 4
+
+    def read(self, addr, access_type=AccessType.NORMAL, num_en_bytes=4):
+        self.read_addrs.append(addr)
+        return self.datas[addr // 4], None
+
+    def write(self, addr, data, access_type=AccessType.NORMAL, num_en_bytes=4):
+        return BusError.ERROR_UNSUPPORTED
+
+
+def test_inst_buffer_no_block_read_on_mmio():
+    program = [enc_i(imm=idx, rs1=0, funct3=0b000, rd=1) for idx in range(80)]
+    slave = CountingRom(program)
+    inst_buf = InstBuffer()
+    # read_blockを持たないslaveでは、fetchした1wordだけを読む
+    if_data, if_ex = IfStage.run(ProgramCounter(8), slave, inst_buf)
+    assert if_ex is None
+    assert if_data.raw == program[2]
+    assert slave.read_addrs == [8]
+    assert inst_buf.datas == []
+
+
+def test_decode_cache():
+    raw = enc_i(imm=3, rs1=2, funct3=0b000, rd=1)
+    id_data0, _ = IdStage.run(IfStage.Result(pc=0x100, raw=raw))
+    id_data1, _ = IdStage.run(IfStage.Result(pc=0x200, raw=raw))
+    # 命令データが同じならPCが違ってもdecode結果を共有する
+    assert id_data1.operand is id_data0.operand
+    assert id_data1.inst_type == InstType.ADDI
+    assert id_data1.fetch_data.pc == 0x200
+
+
+@pytest.mark.parametrize(
+    "raw0, raw1",
+    [
+        # immだけが違う
+        (
+            enc_i(imm=0, rs1=0, funct3=0b000, rd=1),
+            enc_i(imm=10, rs1=0, funct3=0b000, rd=1),
+        ),
+        # offsetだけが違うLoad
+        (
+            enc_i(imm=0, rs1=2, funct3=0b010, rd=5, opcode=0x03),
+            enc_i(imm=4, rs1=2, funct3=0b010, rd=5, opcode=0x03),
+        ),
+        # rs1だけが違う
+        (
+            enc_i(imm=4, rs1=2, funct3=0b000, rd=5),
+            enc_i(imm=4, rs1=3, funct3=0b000, rd=5),
+        ),
+        # store offsetだけが違う
+        (
+            enc_s(imm=0, rs2=1, rs1=2, funct3=0b010),
+            enc_s(imm=8, rs2=1, rs1=2, funct3=0b010),
+        ),
+    ],
+)
+def test_decode_cache_operand_only_diff(raw0: int, raw1: int):
+    # operandだけが違う命令を交互にdecodeしても、両方cacheに残っている
+    for _ in range(2):
+        IdStage.run(IfStage.Result(pc=0x100, raw=raw0))
+        IdStage.run(IfStage.Result(pc=0x104, raw=raw1))
+    for raw in (raw0, raw1):
+        cache_entry = IdStage.decode_cache[IdStage.decode_cache_index(raw)]
+        assert cache_entry is not None and cache_entry[0] == raw
+
+
+def test_u_lui_auipc_jalr():
+    program = [
+        enc_u(imm=0x12345000, rd=1, opcode=0x37),  # lui x1, 0x12345
+        enc_u(imm=0x1000, rd=2, opcode=0x17),  # auipc x2, 0x1
+        enc_i(imm=0x15, rs1=0, funct3=0b000, rd=3),  # addi x3, x0, 0x15
+        enc_i(imm=0, rs1=3, funct3=0b000, rd=3, opcode=0x67),  # jalr x3, 0(x3)
+        enc_i(imm=1, rs1=0, funct3=0b000, rd=4),  # (skipped)
+        enc_i(imm=2, rs1=0, funct3=0b000, rd=5),  # addi x5, x0, 2
+    ]
+    core = run_program(program, num_steps=5)
+    assert core.regs.regs[1] == 0x12345000
+    assert core.regs.regs[2] == 0x1004
+    # jalrの飛び先はbit0を落とす。rdにはrs1を読んだ後に書き戻す
+    assert core.regs.regs[3] == 0x10
+    assert core.regs.regs[4] == 0
+    assert core.regs.regs[5] == 2
+
+
+def test_staged_and_fused_match(caplog: pytest.LogCaptureFixture):
+    program = [
+        enc_i(imm=0, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, 0
+        enc_i(imm=10, rs1=0, funct3=0b000, rd=2),  # addi x2, x0, 10
+        enc_r(funct7=0, rs2=2, rs1=1, funct3=0b000, rd=1),  # loop: add x1, x1, x2
+        enc_i(imm=-1, rs1=2, funct3=0b000, rd=2),  # addi x2, x2, -1
+        enc_b(imm=-8, rs2=0, rs1=2, funct3=0b001),  # bne x2, x0, loop
+        enc_j(imm=0, rd=3),  # jal x3, 0
+    ]
+    num_steps = 2 + 3 * 10 + 5
+    fused_core = run_program(program, num_steps=num_steps)
+    # DEBUG logが有効な場合は各stageを順に実行する
+    with caplog.at_level(logging.DEBUG):
+        staged_core = run_program(program, num_steps=num_steps)
+    assert "[EX ]" in caplog.text
+    assert staged_core.regs.regs == fused_core.regs.regs
+    assert staged_core.pc.value == fused_core.pc.value
+
+
+@pytest.mark.parametrize(
+    "pc, raw",
+    [
+        (0x0, enc_b(imm=-8, rs2=0, rs1=0, funct3=0b000)),  # beq x0, x0, -8
+        (0xFFFFFFFC, enc_b(imm=8, rs2=0, rs1=0, funct3=0b001)),  # bne (not taken)
+        (0xFFFFFFFC, enc_b(imm=8, rs2=0, rs1=0, funct3=0b000)),  # beq x0, x0, 8
+        (0x4, enc_j(imm=-8, rd=1)),  # jal x1, -8
+        (0xFFFFFFFC, enc_j(imm=8, rd=1)),  # jal x1, 8
+        (0xFFFFFFFC, enc_i(imm=4, rs1=0, funct3=0b000, rd=1, opcode=0b1100111)),
+        (0x2000, enc_u(imm=0xFFFFF000, rd=1, opcode=0b0010111)),  # auipc x1
+        (0xFFFFFFFC, enc_i(imm=1, rs1=0, funct3=0b000, rd=1)),  # addi x1, x0, 1
+        (0xFFFFFFFC, enc_i(imm=1, rs1=0, funct3=0b000, rd=0)),  # addi x0 (nop)
+    ],
+)
+def test_pc_wraparound(pc: int, raw: int):
+    id_data, _ = IdStage.run(IfStage.Result(pc=pc, raw=raw))
+    assert id_data is not None
+    # staged: EX -> MEM -> WB (分岐しなければCore.stepと同様に+4)
+    staged_regs = RegFile()
+    ex_data, _ = ExStage.run(id_data, staged_regs)
+    assert ex_data is not None
+    mem_data, _ = MemStage.run(exec_data=ex_data, slave=None)
+    assert mem_data is not None
+    staged_pc = ProgramCounter(pc)
+    wb_data, _ = WbStage.run(mem_data=mem_data, pc=staged_pc, reg_file=staged_regs)
+    assert wb_data is not None
+    if not wb_data.jumped:
+        staged_pc.value = (pc + 4) & 0xFFFFFFFF
+    # fused, compiled
+    fused_func = ExStage.resolve_fused(id_data)
+    assert fused_func is not None
+    fused_regs = RegFile()
+    fused_pc = fused_func(id_data, fused_regs)
+    compiled_regs = RegFile()
+    compiled_pc = BlockCompiler.compile(pc, ((fused_func, id_data),))(compiled_regs)
+    # PC/rdは32bitに丸められ、すべての実行経路で一致する
+    assert 0 <= staged_pc.value <= 0xFFFFFFFF
+    assert fused_pc == compiled_pc == staged_pc.value
+    assert all(0 <= reg <= 0xFFFFFFFF for reg in staged_regs.regs)
+    assert fused_regs.regs == compiled_regs.regs == staged_regs.regs
+
+
+def test_step_n():
+    program = [
+        enc_i(imm=0, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, 0
+        enc_i(imm=10, rs1=0, funct3=0b000, rd=2),  # addi x2, x0, 10
+        enc_r(funct7=0, rs2=2, rs1=1, funct3=0b000, rd=1),  # loop: add x1, x1, x2
+        enc_s(imm=0x100, rs2=1, rs1=0, funct3=0b010),  # sw x1, 0x100(x0)
+        enc_i(imm=-1, rs1=2, funct3=0b000, rd=2),  # addi x2, x2, -1
+        enc_b(imm=-12, rs2=0, rs1=2, funct3=0b001),  # bne x2, x0, loop
+        enc_j(imm=0, rd=0),  # jal x0, 0
+    ]
+    num_steps = 2 + 4 * 10 + 5
+    expected = run_program(program, num_steps=num_steps)
+    core = run_program(program, num_steps=0)
+    core.step_n(num_steps)
+    assert core.regs.regs == expected.regs.regs
+    assert core.pc.value == expected.pc.value
+    assert core.cycles == num_steps
+
+
+def test_block_cache():
+    program = [
+        enc_i(imm=1, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, 1
+        enc_u(imm=0x1000, rd=2, opcode=0b0110111),  # lui x2, 0x1
+        enc_s(imm=0, rs2=1, rs1=2, funct3=0b010),  # sw x1, 0(x2)
+        enc_r(funct7=0, rs2=1, rs1=1, funct3=0b000, rd=3),  # add x3, x1, x1
+        enc_j(imm=0, rd=0),  # jal x0, 0
+    ]
+    core = run_program(program, num_steps=0)
+    # storeの手前までで1block、store自体は一括実行できないので空block
+    assert [id_data.inst_type for _, id_data in core.decode_block(0x0)] == [
+        InstType.ADDI,
+        InstType.LUI,
+    ]
+    assert core.decode_block(0x8) == ()
+    # jalでblockが終わる
+    assert [id_data.inst_type for _, id_data in core.decode_block(0xC)] == [
+        InstType.ADD,
+        InstType.JAL,
+    ]
+    assert core.code_pages == {}
+    assert core.build_block(0x0)[0] == 2
+    assert core.build_block(0x8) == (0, None)
+    assert core.build_block(0xC)[0] == 2
+    assert core.code_pages == {0: {0x0, 0x8, 0xC}}
+
+    core.step_n(5)
+    assert core.regs.regs[1:4] == [1, 0x1000, 2]
+    assert core.pc.value == 0x10
+    assert core.cycles == 5
+
+    # 登録していないpageへの書き込み(sw)ではblock cacheは残る
+    assert len(core.block_cache) == 3
+    # 登録済pageへの書き込みでそのpageのblockを破棄する
+    core.invalidate_icache(0x4)
+    assert core.block_cache == {}
+    assert core.code_pages == {}
+
+
+def test_block_cache_page_crossing():
+    nop = enc_i(imm=0, rs1=0, funct3=0b000, rd=0)  # addi x0, x0, 0
+    program = [nop] * 0x400 + [enc_j(imm=0, rd=0)]  # jal x0, 0
+    core = run_program(program, num_steps=0)
+    # pageを跨ぐblockは両方のpageに登録し、どちらへの書き込みでも破棄する
+    assert core.build_block(0xFF8)[0] == 3
+    assert core.build_block(0x1000)[0] == 1
+    assert core.code_pages == {0: {0xFF8}, 1: {0xFF8, 0x1000}}
+    core.invalidate_icache(0x1000)
+    assert core.block_cache == {}
+    # 他のpageにかかっていないblockは書き込まれたpage以外では破棄しない
+    assert core.build_block(0x0)[0] == 64
+    core.invalidate_icache(0x1000)
+    assert list(core.block_cache) == [0x0]
+
+
+@pytest.mark.parametrize(
+    "raw, is_nop, next_pc",
+    [
+        (enc_i(imm=5, rs1=1, funct3=0b000, rd=0), True, 0x104),  # addi x0, x1, 5
+        # div x0, x1, x0
+        (enc_r(funct7=1, rs2=0, rs1=1, funct3=0b100, rd=0), True, 0x104),
+        (enc_u(imm=0x1000, rd=0, opcode=0b0110111), True, 0x104),  # lui x0, 0x1
+        (enc_i(imm=5, rs1=1, funct3=0b000, rd=1), False, 0x104),  # addi x1, x1, 5
+        (enc_j(imm=8, rd=0), False, 0x108),  # jal x0, 8
+    ],
+)
+def test_resolve_fused_rd_zero(raw: int, is_nop: bool, next_pc: int):
+    id_data, _ = IdStage.run(IfStage.Result(pc=0x100, raw=raw))
+    assert id_data is not None
+    fused_func = ExStage.resolve_fused(id_data)
+    assert (fused_func == ExStage._fused_nop) == is_nop
+    core = run_program([], num_steps=0)
+    core.regs.regs[1] = 7
+    assert fused_func is not None
+    assert fused_func(id_data, core.regs) == next_pc
+    assert core.regs.regs[0] == 0
+
+
+def test_disable_m_extension():
+    program = [
+        enc_i(imm=3, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, 3
+        enc_r(funct7=1, rs2=1, rs1=1, funct3=0b000, rd=2),  # mul x2, x1, x1
+    ]
+    core = run_program(program, num_steps=2)
+    assert core.regs.regs[2] == 9
+
+    ram = FixSizeRam(name="ram", size=0x1000, init_data=program)
+    bus = BusArbiter(name="bus", entries=[BusArbiterEntry(slave=ram, start_addr=0)])
+    core = Core(config=CoreConfig(init_pc=0, enable_m=False), slave=bus)
+    # M拡張の命令は不正命令になり、blockにも含めない
+    assert len(core.decode_block(0x0)) == 1
+    with pytest.raises(RuntimeError):
+        core.step_n(2)
+    assert core.regs.regs[1] == 3
+    assert core.pc.value == 0x4
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        enc_r(funct7=0b0000000, rs2=2, rs1=1, funct3=0b000, rd=3),  # add
+        enc_r(funct7=0b0100000, rs2=2, rs1=1, funct3=0b000, rd=3),  # sub
+        enc_r(funct7=0b0000000, rs2=2, rs1=1, funct3=0b001, rd=3),  # sll
+        enc_r(funct7=0b0000000, rs2=2, rs1=1, funct3=0b010, rd=3),  # slt
+        enc_r(funct7=0b0000000, rs2=2, rs1=1, funct3=0b011, rd=3),  # sltu
+        enc_r(funct7=0b0000000, rs2=2, rs1=1, funct3=0b100, rd=3),  # xor
+        enc_r(funct7=0b0000000, rs2=2, rs1=1, funct3=0b101, rd=3),  # srl
+        enc_r(funct7=0b0100000, rs2=2, rs1=1, funct3=0b101, rd=3),  # sra
+        enc_r(funct7=0b0000000, rs2=2, rs1=1, funct3=0b110, rd=3),  # or
+        enc_r(funct7=0b0000000, rs2=2, rs1=1, funct3=0b111, rd=3),  # and
+        enc_r(funct7=0b0000001, rs2=2, rs1=1, funct3=0b001, rd=3),  # mulh
+        enc_r(funct7=0b0000001, rs2=2, rs1=1, funct3=0b100, rd=3),  # div
+        enc_i(imm=-5, rs1=1, funct3=0b000, rd=3),  # addi
+        enc_i(imm=-5, rs1=1, funct3=0b010, rd=3),  # slti
+        enc_i(imm=-5, rs1=1, funct3=0b011, rd=3),  # sltiu
+        enc_i(imm=-5, rs1=1, funct3=0b100, rd=3),  # xori
+        enc_i(imm=-5, rs1=1, funct3=0b110, rd=3),  # ori
+        enc_i(imm=-5, rs1=1, funct3=0b111, rd=3),  # andi
+        enc_i(imm=7, rs1=1, funct3=0b001, rd=3),  # slli
+        enc_i(imm=7, rs1=1, funct3=0b101, rd=3),  # srli
+        enc_i(imm=0x400 | 7, rs1=1, funct3=0b101, rd=3),  # srai
+        enc_i(imm=-5, rs1=1, funct3=0b000, rd=0),  # addi x0 (nop)
+        enc_u(imm=0xFFFFF000, rd=3, opcode=0b0110111),  # lui
+        enc_u(imm=0xFFFFF000, rd=3, opcode=0b0010111),  # auipc
+        enc_b(imm=-8, rs2=2, rs1=1, funct3=0b000),  # beq
+        enc_b(imm=-8, rs2=2, rs1=1, funct3=0b001),  # bne
+        enc_b(imm=-8, rs2=2, rs1=1, funct3=0b100),  # blt
+        enc_b(imm=-8, rs2=2, rs1=1, funct3=0b101),  # bge
+        enc_b(imm=-8, rs2=2, rs1=1, funct3=0b110),  # bltu
+        enc_b(imm=-8, rs2=2, rs1=1, funct3=0b111),  # bgeu
+        enc_j(imm=-8, rd=3),  # jal
+        enc_i(imm=-3, rs1=1, funct3=0b000, rd=1, opcode=0b1100111),  # jalr x1, x1
+    ],
+)
+@pytest.mark.parametrize(
+    "rs1_data, rs2_data", [(0x7FFFFFF0, 0x80000003), (0xFFFFFFFF, 0x21), (5, 5)]
+)
+def test_block_compiler(raw: int, rs1_data: int, rs2_data: int):
+    id_data, _ = IdStage.run(IfStage.Result(pc=0x100, raw=raw))
+    assert id_data is not None
+    fused_func = ExStage.resolve_fused(id_data)
+    assert fused_func is not None
+    # 生成した関数とfused関数で、次のPCとレジスタの値が一致する
+    compiled = BlockCompiler.compile(0x100, ((fused_func, id_data),))
+    expected_regs = RegFile()
+    expected_regs.regs[1:3] = [rs1_data, rs2_data]
+    actual_regs = RegFile()
+    actual_regs.regs[1:3] = [rs1_data, rs2_data]
+    assert compiled(actual_regs) == fused_func(id_data, expected_regs)
+    assert actual_regs.regs == expected_regs.regs
+
+
+def test_hot_block_compile():
+    program = [
+        enc_i(imm=0, rs1=0, funct3=0b000, rd=1),  # addi x1, x0, 0
+        enc_i(imm=100, rs1=0, funct3=0b000, rd=2),  # addi x2, x0, 100
+        enc_r(funct7=0, rs2=2, rs1=1, funct3=0b000, rd=1),  # loop: add x1, x1, x2
+        enc_r(funct7=1, rs2=2, rs1=2, funct3=0b000, rd=3),  # mul x3, x2, x2
+        enc_i(imm=-1, rs1=2, funct3=0b000, rd=2),  # addi x2, x2, -1
+        enc_b(imm=-12, rs2=0, rs1=2, funct3=0b001),  # bne x2, x0, loop
+        enc_j(imm=0, rd=0),  # jal x0, 0
+    ]
+    num_steps = 2 + 4 * 100 + 3
+    expected = run_program(program, num_steps=num_steps)
+    core = run_program(program, num_steps=0)
+    core.step_n(num_steps)
+    assert core.regs.regs == expected.regs.regs
+    assert core.pc.value == expected.pc.value
+    assert core.cycles == num_steps
+    # loop本体は関数に変換済
+    _, run_block = core.block_cache[0x8]
+    assert run_block is not None
+    assert run_block.__code__.co_filename == "<block 0x00000008>"
@@ -1,6 +1,13 @@
 import pytest
 
-from bonsai.emu.mem import AccessType, BusArbiter, BusArbiterEntry, UartModule
+from bonsai.emu.mem import (
+    AccessType,
+    BusArbiter,
+    BusArbiterEntry,
+    BusError,
+    FixSizeRam,
+    UartModule,
+)
 
 
 def test_uart(
@@ -35,3 +42,32 @@ def test_arbitor(
             base_addr + UartModule.RegIdx.TX_DATA.value * 4, ord(c), AccessType.NORMAL
         )
     assert dut_uart.stdout == stdin
+
+
+def test_read_block():
+    dut_ram = FixSizeRam(name="ram", size=0x100, init_data=list(range(0x40)))
+    dut_bus = BusArbiter(
+        name="bus", entries=[BusArbiterEntry(slave=dut_ram, start_addr=0x1000)]
+    )
+    datas, err = dut_bus.read_block(0x1010, 4)
+    assert err is None
+    assert datas == [4, 5, 6, 7]
+    # slaveの範囲外
+    _, err = dut_bus.read_block(0x10F0, 8)
+    assert err == BusError.ERROR_OUT_OF_RANGE
+    # word単位でないアドレス
+    _, err = dut_bus.read_block(0x1002, 1)
+    assert err == BusError.ERROR_MISALIGN
+
+
+def test_get_word_view():
+    dut_ram = FixSizeRam(name="ram", size=0x100, init_data=list(range(0x40)))
+    dut_bus = BusArbiter(
+        name="bus", entries=[BusArbiterEntry(slave=dut_ram, start_addr=0x1000)]
+    )
+    base_addr, datas = dut_bus.get_word_view(0x1010)
+    assert base_addr == 0x1000
+    # コピーではなく生データそのもの
+    assert datas is dut_ram.datas
+    assert dut_bus.get_word_view(0x2000) is None
+    assert UartModule(name="uart").get_word_view(0) is None